@@ -6,17 +6,32 @@ from typing_extensions import TypedDict, Annotated
 from langchain_core.prompts.chat import ChatPromptTemplate
 from langgraph.graph import START, StateGraph, END
 from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage, AIMessage
-from prompt_library.prompt import system_prompt
+from langgraph.prebuilt.chat_agent_executor import AgentState as ReactAgentState
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from prompt_library.prompt import system_prompt, information_system_prompt, booking_system_prompt
 from utils.llms import LLMModel
+from utils.router import pre_route, router_stats, confirms_offer, ROUTER_CONFIDENCE
+from utils.intent import extract_intent
+from utils.response_cache import ResponseCache
+from utils.context import window_messages, update_frame, DEFAULT_KEEP_TURNS
+from utils.metrics import LOOP_GUARD_EXITS, instrument_langchain
+from utils.log import get_logger, dump_state
+from data_models.models import PendingAppointment
+from toolkit.registry import get_tool_registry
+from toolkit.schedule_store import BookingResult, get_schedule_store
 from toolkit.toolkits import *
+import asyncio
 import json
+import os
 import re
 try:
     from groq import BadRequestError as GroqBadRequestError
 except ImportError:
     GroqBadRequestError = Exception
 
+logger = get_logger(__name__)
+
 # router typed dict unchanged
 class Router(TypedDict):
     next: Literal["information_node", "booking_node", "FINISH"]
@@ -31,21 +46,122 @@ class AgentState(TypedDict):
     current_reasoning: str
     turns: int  # new field to count supervisor entries
     last_node: str  # track last node visited to detect loops
+    pending_appointment: dict  # PendingAppointment frame, see utils/context.update_frame
+
+# state seen by the booking ReAct agent: its own messages plus the patient ID,
+# which its prompt template reads on every call
+class BookingAgentState(ReactAgentState):
+    id_number: int
+
+INFORMATION_TOOLS = [check_availability_by_doctor, check_availability_by_specialization, check_specific_slot, check_availability_range]
+BOOKING_TOOLS = [set_appointment, cancel_appointment, reschedule_appointment, list_my_appointments]
 
 class DoctorAppointmentAgent:
-    def __init__(self):
-        llm_model = LLMModel()
-        self.llm_model = llm_model.get_model()
+    def __init__(self, llm_model=None, pre_router=True, registry=None):
+        if llm_model is None:
+            llm_model = LLMModel().get_model()
+        self.llm_model = llm_model
+        self.pre_router = pre_router
+        self.app = None
+        # availability replies keyed on the question's intent; 0 entries disables it
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 1024)),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300)),
+            # slot-taken replies suggest alternatives from the days either side
+            day_window=SLOT_SEARCH_DAYS,
+        )
+        # doctors/specializations of the schedule and the tools typed with them
+        self.registry = registry or get_tool_registry()
+        self.registry.store.add_change_listener(
+            lambda date, doctor: self.response_cache.invalidate(date, doctor, self._doctor_roster().get(doctor))
+        )
+        self.registry.add_roster_listener(lambda roster: self.build_sub_agents())
+        # user turns sent to the LLMs verbatim; older ones are summarised (0 = send everything)
+        self.context_turns = int(os.getenv("CONTEXT_KEEP_TURNS", DEFAULT_KEEP_TURNS))
+        # node, tool and LLM timings for /metrics (utils/metrics.py)
+        instrument_langchain()
+        self.build_sub_agents()
+
+    def build_sub_agents(self):
+        """
+        Build the router and ReAct workers once; they are stateless between
+        calls and shared by every request. Rebuilt when the roster changes,
+        with tool schemas bound from the registry's cache.
+        """
+        self.router_llm = self.llm_model.with_structured_output(Router)
+        self.information_agent = create_react_agent(
+            model=self.llm_model.bind_tools(self.registry.schemas(INFORMATION_TOOLS)),
+            tools=self.registry.tools(INFORMATION_TOOLS),
+            prompt=ChatPromptTemplate.from_messages(
+                [
+                    ("system", information_system_prompt),
+                    ("placeholder", "{messages}"),
+                ]
+            ),
+        )
+        self.booking_agent = create_react_agent(
+            model=self.llm_model.bind_tools(self.registry.schemas(BOOKING_TOOLS)),
+            tools=self.registry.tools(BOOKING_TOOLS),
+            prompt=ChatPromptTemplate.from_messages(
+                [
+                    ("system", booking_system_prompt),
+                    ("placeholder", "{messages}"),
+                ]
+            ),
+            state_schema=BookingAgentState,
+        )
+
+    def _doctor_roster(self) -> dict:
+        """{doctor: specialization} for intent/fact extraction."""
+        return self.registry.roster().doctors
+
+    def _llm_messages(self, messages: list) -> list:
+        """The part of the conversation an LLM call sees, see utils/context.py."""
+        if self.context_turns <= 0:
+            return messages
+        return window_messages(messages, self._doctor_roster(), self.context_turns)
+
+    def _pending_appointment(self, state: AgentState) -> PendingAppointment:
+        """The state's appointment frame, caught up with any messages it hasn't seen."""
+        frame = PendingAppointment(**(state.get("pending_appointment") or {}))
+        if frame.seen > len(state["messages"]):  # history was replaced (stateless request)
+            frame = PendingAppointment()
+        return update_frame(frame, state["messages"], self._doctor_roster())
+
+    def _router_messages(self, state: AgentState) -> list:
+        """Prompt for the routing LLM: system + user id + current conversation, as dicts for structured output."""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"user's identification number is {state['id_number']}"}
+        ]
+
+        # Convert LangChain message objects to dict format (older turns arrive summarised)
+        for msg in self._llm_messages(state["messages"]):
+            if isinstance(msg, HumanMessage):
+                messages.append({"role": "user", "content": msg.content})
+            elif isinstance(msg, AIMessage):
+                messages.append({"role": "assistant", "content": msg.content})
+            elif isinstance(msg, SystemMessage):
+                messages.append({"role": "system", "content": msg.content})
+            elif isinstance(msg, dict):
+                messages.append(msg)
+        return messages
 
-    def supervisor_node(self, state: AgentState) -> Command[Literal['information_node', 'booking_node', '__end__']]:
+    async def supervisor_node(self, state: AgentState, config: RunnableConfig) -> Command[Literal['information_node', 'booking_node', '__end__']]:
+        """Keep the pending-appointment frame up to date, then route (see _route)."""
+        command = await self._route(state, config)
+        frame = self._pending_appointment(state).model_dump()
+        return Command(goto=command.goto, update={**command.update, "pending_appointment": frame})
+
+    async def _route(self, state: AgentState, config: RunnableConfig) -> Command[Literal['information_node', 'booking_node', '__end__']]:
         """
-        Supervisor decides which node to call next based on the LLM structured output.
+        Supervisor decides which node to call next: the rule-based pre-router
+        (utils/router.py) when it is confident, otherwise the LLM structured output.
         - preserves conversation history (doesn't clobber it)
         - increments a turns counter and ends if too many iterations
         """
 
-        print("**************************below is my state right after entering****************************")
-        print(state)
+        dump_state(logger, "supervisor state", state)
 
         # initialize turns if not present
         turns = state.get("turns", 0)
@@ -55,12 +171,14 @@ class DoctorAppointmentAgent:
         # Safety stop: avoid infinite loops from LLM uncertainty
         MAX_TURNS = 8
         if turns > MAX_TURNS:
-            print(f"Reached max turns ({MAX_TURNS}). Ending.")
+            logger.warning("Reached max turns (%d). Ending.", MAX_TURNS, extra={"guard": "max_turns"})
+            LOOP_GUARD_EXITS.inc(reason="max_turns")
             return Command(goto=END, update={"turns": turns, "last_node": "supervisor"})
         
         # Check if we've been to the same node 3+ times in a row (likely a loop)
         if turns > 3 and last_node and last_node == state.get("next", ""):
-            print(f"Detected loop: visited {last_node} multiple times. Finishing.")
+            logger.warning("Detected loop: visited %s multiple times. Finishing.", last_node, extra={"guard": "loop_detected"})
+            LOOP_GUARD_EXITS.inc(reason="loop_detected")
             return Command(
                 goto=END,
                 update={
@@ -70,25 +188,6 @@ class DoctorAppointmentAgent:
                 }
             )
 
-        # Build prompt messages (system + user id + current conversation)
-        # Convert LangChain messages to dict format for structured output
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"user's identification number is {state['id_number']}"}
-        ]
-        
-        # Convert LangChain message objects to dict format
-        for msg in state["messages"]:
-            if isinstance(msg, HumanMessage):
-                messages.append({"role": "user", "content": msg.content})
-            elif isinstance(msg, AIMessage):
-                messages.append({"role": "assistant", "content": msg.content})
-            elif isinstance(msg, dict):
-                messages.append(msg)
-
-        print("***********************this is my message*****************************************")
-        print(messages)
-
         # Extract the user's query (only if the last message is a user message)
         query = ""
         if len(state['messages']) >= 1:
@@ -103,8 +202,7 @@ class DoctorAppointmentAgent:
                 except Exception:
                     query = ""
 
-        print("************below is my query********************")
-        print(query)
+        logger.debug("query: %s", query)
 
         # Check if the last AI message already answered the user's query
         # This prevents infinite loops when the same response is repeated
@@ -115,7 +213,8 @@ class DoctorAppointmentAgent:
             # If last message is AI and second last is also AI (same response repeated), finish
             if isinstance(last_msg, AIMessage) and isinstance(second_last_msg, AIMessage):
                 if last_msg.content.strip() == second_last_msg.content.strip():
-                    print("Detected duplicate response. Finishing.")
+                    logger.warning("Detected duplicate response. Finishing.", extra={"guard": "duplicate_response"})
+                    LOOP_GUARD_EXITS.inc(reason="duplicate_response")
                     return Command(
                         goto=END,
                         update={
@@ -153,7 +252,7 @@ class DoctorAppointmentAgent:
                 
                 # Also check if query signals booking completion
                 if query == "BOOKING_COMPLETE" or booking_complete:
-                    print("Booking action completed successfully. Finishing.")
+                    logger.info("Booking action completed successfully. Finishing.")
                     return Command(
                         goto=END,
                         update={
@@ -177,7 +276,7 @@ class DoctorAppointmentAgent:
                 if has_availability_info and turns > 3:
                     # Check if user hasn't provided a new question (query is empty or same as before)
                     if not query or query == state.get("query", ""):
-                        print("Availability info provided and no new query. Finishing.")
+                        logger.debug("Availability info provided and no new query. Finishing.")
                         return Command(
                             goto=END,
                             update={
@@ -191,7 +290,9 @@ class DoctorAppointmentAgent:
                 
                 # If we've been through supervisor many times and last message is AI, finish
                 if turns > 5 and isinstance(last_msg, AIMessage):
-                    print(f"High turn count ({turns}) with AI response. Finishing to prevent loop.")
+                    logger.warning("High turn count (%d) with AI response. Finishing to prevent loop.", turns,
+                                   extra={"guard": "high_turn_count"})
+                    LOOP_GUARD_EXITS.inc(reason="high_turn_count")
                     return Command(
                         goto=END,
                         update={
@@ -203,56 +304,63 @@ class DoctorAppointmentAgent:
                         },
                     )
 
-        # Ask the LLM for routing decision using structured output
-        # Use a fallback approach for Groq models that don't support tool calling reliably
-        try:
-            response = self.llm_model.with_structured_output(Router).invoke(messages)
-            goto = response["next"]
-            reasoning = response.get("reasoning", "")
-        except (GroqBadRequestError, Exception) as e:
-            # Fallback: Use simple inference based on conversation
-            print(f"Structured output failed: {e}. Using inference fallback.")
+        # Deterministic pre-router: obvious turns (a worker just replied, a plain
+        # availability question, a "yes" to an offered booking) skip the LLM
+        decision = pre_route(state["messages"]) if self.pre_router else None
+        if decision is not None and decision.confidence >= ROUTER_CONFIDENCE:
+            goto, reasoning = decision.goto, decision.reasoning
+            router_stats.record(decision, used_llm=False)
+        else:
+            router_stats.record(decision, used_llm=True)
+            # Ask the LLM for routing decision using structured output
+            # Use a fallback approach for Groq models that don't support tool calling reliably
+            try:
+                messages = self._router_messages(state)
+                dump_state(logger, "supervisor messages", messages)
+                response = await self.router_llm.ainvoke(messages, config)
+                goto = response["next"]
+                reasoning = response.get("reasoning", "")
+            except (GroqBadRequestError, Exception) as e:
+                # Fallback: Use simple inference based on conversation
+                logger.warning("Structured output failed: %s. Using inference fallback.", e)
             
-            # Simple inference based on last messages
-            goto = "FINISH"  # Default to finish
-            reasoning = "Structured output failed, defaulting to FINISH"
+                # Simple inference based on last messages
+                goto = "FINISH"  # Default to finish
+                reasoning = "Structured output failed, defaulting to FINISH"
             
-            # Check last few messages to infer intent
-            if len(state["messages"]) > 0:
-                last_user_msg = None
-                last_ai_msg = None
+                # Check last few messages to infer intent
+                if len(state["messages"]) > 0:
+                    last_user_msg = None
+                    last_ai_msg = None
                 
-                for msg in reversed(state["messages"]):
-                    if isinstance(msg, HumanMessage) and last_user_msg is None:
-                        last_user_msg = msg.content.lower()
-                    elif isinstance(msg, AIMessage) and last_ai_msg is None:
-                        last_ai_msg = msg.content.lower()
-                    if last_user_msg and last_ai_msg:
-                        break
+                    for msg in reversed(state["messages"]):
+                        if isinstance(msg, HumanMessage) and last_user_msg is None:
+                            last_user_msg = msg.content.lower()
+                        elif isinstance(msg, AIMessage) and last_ai_msg is None:
+                            last_ai_msg = msg.content.lower()
+                        if last_user_msg and last_ai_msg:
+                            break
                 
-                # Infer routing based on content
-                if last_user_msg:
-                    if any(word in last_user_msg for word in ["book", "appointment", "schedule", "cancel", "reschedule"]):
-                        goto = "booking_node"
-                        reasoning = "User wants to book/cancel/reschedule"
-                    elif any(word in last_user_msg for word in ["available", "availability", "slot", "time", "when"]):
-                        goto = "information_node"
-                        reasoning = "User asking about availability"
-                    elif "successfully" in last_ai_msg or "booked" in last_ai_msg:
+                    # Infer routing based on content
+                    if last_user_msg:
+                        if any(word in last_user_msg for word in ["book", "appointment", "schedule", "cancel", "reschedule"]):
+                            goto = "booking_node"
+                            reasoning = "User wants to book/cancel/reschedule"
+                        elif any(word in last_user_msg for word in ["available", "availability", "slot", "time", "when"]):
+                            goto = "information_node"
+                            reasoning = "User asking about availability"
+                        elif "successfully" in last_ai_msg or "booked" in last_ai_msg:
+                            goto = "FINISH"
+                            reasoning = "Appointment already booked"
+                    elif last_ai_msg and ("available" in last_ai_msg or "slot" in last_ai_msg):
+                        # If AI just provided availability, check if user wants to book
                         goto = "FINISH"
-                        reasoning = "Appointment already booked"
-                elif last_ai_msg and ("available" in last_ai_msg or "slot" in last_ai_msg):
-                    # If AI just provided availability, check if user wants to book
-                    goto = "FINISH"
-                    reasoning = "Availability provided, waiting for user response"
+                        reasoning = "Availability provided, waiting for user response"
             
-            # Use the inferred routing (goto and reasoning are already set above)
-            print(f"Using inference fallback: goto={goto}, reasoning={reasoning}")
+                # Use the inferred routing (goto and reasoning are already set above)
+                logger.info("Using inference fallback: goto=%s, reasoning=%s", goto, reasoning)
 
-        print("********************************this is my goto*************************")
-        print(goto)
-        print("********************************")
-        print(reasoning)
+        logger.debug("route: goto=%s, reasoning=%s", goto, reasoning, extra={"goto": goto, "turns": turns})
 
         # Map "FINISH" from LLM to END for langgraph
         if goto == "FINISH":
@@ -283,77 +391,60 @@ class DoctorAppointmentAgent:
             },
         )
 
-    def information_node(self, state: AgentState) -> Command[Literal['supervisor']]:
+    async def information_node(self, state: AgentState, config: RunnableConfig) -> Command[Literal['supervisor']]:
         """
         Specialized node to check availability (uses tools).
         Appends the agent's reply to messages and returns to supervisor.
         """
-        print("*****************called information node************")
+        logger.debug("information node")
         
         # Check if we've already answered this query to prevent repetition
         if len(state["messages"]) >= 2:
             last_ai_msg = None
-            for msg in reversed(state["messages"]):
+            last_ai_index = -1
+            for i in range(len(state["messages"]) - 1, -1, -1):
+                msg = state["messages"][i]
                 if isinstance(msg, AIMessage) and hasattr(msg, 'name') and msg.name == "information_node":
                     last_ai_msg = msg
+                    last_ai_index = i
                     break
             
             # If we already provided availability info and user hasn't asked a new question, skip
             if last_ai_msg and ("AVAILABLE" in last_ai_msg.content.upper() or "NOT AVAILABLE" in last_ai_msg.content.upper()):
-                # Check if the last user message is the same as before
-                last_user_msg = None
-                for msg in reversed(state["messages"]):
-                    if isinstance(msg, HumanMessage):
-                        last_user_msg = msg
-                        break
+                # Check whether a user message arrived after that reply
+                # (with server-side sessions earlier replies keep their node name)
+                new_user_msg = any(
+                    isinstance(msg, HumanMessage) for msg in state["messages"][last_ai_index + 1:]
+                )
                 
                 # If user hasn't provided new input, return to supervisor to finish
-                if last_user_msg and last_user_msg.content == state.get("query", ""):
+                if not new_user_msg:
                     return Command(
                         update={"messages": state["messages"]},
                         goto="supervisor",
                     )
 
-        system_prompt_local = (
-            "You're a friendly receptionist helping someone book an appointment. "
-            "Write like you're sending a text message - simple, casual, and easy to read.\n\n"
-            
-            "EXAMPLES OF GOOD RESPONSES:\n\n"
-            
-            "If time NOT available:\n"
-            "'Sorry, 8 PM isn't available on that day. But I have these times: Dr. Emily Johnson at 8 AM, 8:30 AM, or 10 AM. Dr. John Doe at 8 AM, 9 AM, or 9:30 AM. Which one works for you?'\n\n"
-            
-            "If doctor not specified:\n"
-            "'I have two doctors available: Dr. Emily Johnson has slots at 8 AM, 8:30 AM, or 10 AM. Dr. John Doe has 8 AM, 9 AM, or 9:30 AM. Which doctor do you prefer?'\n\n"
-            
-            "If time IS available:\n"
-            "'Yes! That time is available. So that's [date] at [time] with Dr. [name], right? Should I go ahead and book it?'\n\n"
-            
-            "CRITICAL RULES:\n"
-            "- Write in plain text only - NO markdown, NO bold, NO dashes, NO bullet points\n"
-            "- Write like a text message - short sentences, casual tone\n"
-            "- Times: Use '8 AM' not '8:00 AM', '8 PM' not '20:00'\n"
-            "- Keep it under 80 words\n"
-            "- Be friendly but not overly formal\n"
-            "- Current year is 2024\n"
-            "- Don't repeat information you already gave\n"
-        )
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", system_prompt_local),
-                ("placeholder", "{messages}"),
-            ]
-        )
+        # Same question (date, doctor/specialization, time) answered recently: reuse the reply
+        intent = None
+        if self.response_cache.max_entries > 0:
+            question = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+            intent = extract_intent(question, self._doctor_roster())
+        cached = self.response_cache.get(intent) if intent else None
+        if cached is not None:
+            return Command(
+                update={
+                    "messages": state["messages"] + [AIMessage(content=cached.reply, name="information_node")],
+                    "query": "",
+                },
+                goto="supervisor",
+            )
 
-        information_agent = create_react_agent(
-            model=self.llm_model,
-            tools=[check_availability_by_doctor, check_availability_by_specialization, check_specific_slot],
-            prompt=prompt,
-        )
+        generation = self.response_cache.generation
 
-        # call the agent; it expects the same state shape (we've preserved it)
-        result = information_agent.invoke(state)
+        # call the shared agent; it expects the same state shape (we've preserved it),
+        # with older turns summarised. Passing config on keeps its LLM tokens visible to graph streaming.
+        llm_messages = self._llm_messages(state["messages"])
+        result = await self.information_agent.ainvoke({**state, "messages": llm_messages}, config)
 
         # Pull the assistant message (best effort)
         assistant_msg = ""
@@ -362,6 +453,15 @@ class DoctorAppointmentAgent:
         except Exception:
             assistant_msg = str(result)
 
+        # only replies grounded in a tool lookup are worth reusing
+        if intent:
+            tool_results = [
+                m.content for m in result.get("messages", [])[len(llm_messages):]
+                if isinstance(m, ToolMessage)
+            ]
+            if tool_results:
+                self.response_cache.put(intent, assistant_msg, tool_results, generation)
+
         # Append the assistant's reply to conversation and go back to supervisor
         new_messages = state["messages"] + [AIMessage(content=assistant_msg, name="information_node")]
 
@@ -374,73 +474,20 @@ class DoctorAppointmentAgent:
             goto="supervisor",
         )
 
-    def booking_node(self, state: AgentState) -> Command[Literal['supervisor']]:
+    async def booking_node(self, state: AgentState, config: RunnableConfig) -> Command[Literal['supervisor']]:
         """
         Specialized node to set/cancel/reschedule appointments.
         """
-        print("*****************called booking node************")
-
-        patient_id = state.get('id_number', '')
-        system_prompt_local = (
-            f"You are a friendly assistant helping patients book appointments. "
-            f"The patient's ID number is: {patient_id}\n"
-            f"Your job is to EXTRACT information from the conversation and BOOK the appointment IMMEDIATELY when user confirms.\n\n"
-            
-            "**CRITICAL - EXTRACT INFORMATION FROM CONVERSATION:**\n"
-            "- Read the ENTIRE conversation history CAREFULLY to find: date, time, and doctor name\n"
-            f"- The patient ID is: {patient_id} (ALWAYS use this in set_appointment tool)\n"
-            "- Look for time mentions like '10:30 AM', '2 PM', '10:30', etc. in EARLIER messages\n"
-            "- Look for date mentions like 'August 7th', '07-08-2024', '08-07-2024', etc.\n"
-            "- Look for doctor name mentions like 'Dr. John Doe', 'John Doe', etc.\n"
-            "- DO NOT ask for information that's already in the conversation\n"
-            "- DO NOT ask for patient ID - you already have it\n\n"
-            
-            "**WHEN USER SAYS 'YES' OR CONFIRMS:**\n"
-            "1. If the conversation mentions a specific time (e.g., '10:30 AM', '2 PM'):\n"
-            "   - Extract: date, time, doctor name from EARLIER in the conversation\n"
-            "   - IMMEDIATELY call set_appointment tool - DO NOT ask for time again\n"
-            "   - Format: date as 'DD-MM-YYYY HH:MM' (e.g., '07-08-2024 10:30' for 10:30 AM)\n"
-            "   - Convert time: '10:30 AM' = '10:30', '2 PM' = '14:00', '8 AM' = '08:00'\n"
-            "   - After booking, confirm: 'Great! Your appointment is booked for [date] at [time] with Dr. [name]. See you then!'\n\n"
-            
-            "2. If user confirms but time is unclear:\n"
-            "   - Look back in conversation for the MOST RECENT time mentioned\n"
-            "   - Use that time to book\n"
-            "   - DO NOT ask user to choose again\n\n"
-            
-            "**EXAMPLES:**\n"
-            "- Conversation: '10:30 AM on August 7th' + user says 'yes':\n"
-            f"  → Call set_appointment(date='07-08-2024 10:30', id_number='{patient_id}', doctor_name='john doe')\n"
-            "- Conversation: '2PM' + user says 'yes':\n"
-            f"  → Call set_appointment(date='08-08-2024 14:00', id_number='{patient_id}', doctor_name='john doe')\n\n"
-            
-            "**ABSOLUTE RULES:**\n"
-            "- If user says 'yes' or confirms, BOOK IMMEDIATELY - do not check availability again\n"
-            "- DO NOT call check_specific_slot or check_availability tools if user already confirmed\n"
-            "- DO NOT ask for time again if time was already mentioned\n"
-            "- DO NOT ask 'which time' if time was already confirmed\n"
-            "- Extract time from EARLIER conversation messages, not from asking again\n"
-            "- When user confirms, look BACK in conversation for the time they agreed to\n"
-            "- If you have date, time, doctor, and patient ID, call set_appointment IMMEDIATELY\n"
-            "- Only check availability if user is ASKING about availability, not if they're CONFIRMING a booking\n"
-            "- Current year is 2024\n"
-            "- After successful booking, conversation is complete\n"
-        )
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", system_prompt_local),
-                ("placeholder", "{messages}"),
-            ]
-        )
+        logger.debug("booking node")
 
-        booking_agent = create_react_agent(
-            model=self.llm_model,
-            tools=[set_appointment, cancel_appointment, reschedule_appointment],
-            prompt=prompt,
-        )
+        # Confirming an offer whose doctor, date and time are all known: book it
+        # straight away, no LLM round needed
+        frame = self._pending_appointment(state)
+        if frame.ready_to_book() and confirms_offer(state["messages"]):
+            return await self._book_pending(state, frame)
 
-        result = booking_agent.invoke(state)
+        # the patient ID reaches the prompt through state["id_number"]
+        result = await self.booking_agent.ainvoke({**state, "messages": self._llm_messages(state["messages"])}, config)
 
         try:
             assistant_msg = result["messages"][-1].content
@@ -468,11 +515,44 @@ class DoctorAppointmentAgent:
             goto="supervisor",
         )
 
+    async def _book_pending(self, state: AgentState, frame: PendingAppointment) -> Command[Literal['supervisor']]:
+        # the store write (file lock, journal fsync) runs in a worker thread, off the event loop;
+        # book_many reports why a booking failed, book() only that it did
+        [result] = await asyncio.to_thread(
+            get_schedule_store().book_many, [(frame.slot(), frame.doctor.lower(), state["id_number"])]
+        )
+        when = f"{frame.date} at {convert_to_am_pm(frame.time)} with Dr. {frame.doctor.title()}"
+        query_update = "BOOKING_COMPLETE" if result is BookingResult.BOOKED else ""
+        reply = {
+            BookingResult.BOOKED: f"Great! Your appointment is booked for {when}. See you then!",
+            BookingResult.SLOT_TAKEN: f"Sorry, {when} was just taken. Would you like me to look for another time?",
+            BookingResult.UNKNOWN_SLOT: f"Sorry, Dr. {frame.doctor.title()} has no slot on {frame.date} at {convert_to_am_pm(frame.time)}. Would you like me to look for another time?",
+            BookingResult.INVALID: "Sorry, I couldn't book that: the patient ID or the date and time is not valid.",
+        }[result]
+        return Command(
+            update={
+                "messages": state["messages"] + [AIMessage(content=reply, name="booking_node")],
+                "query": query_update,
+            },
+            goto="supervisor",
+        )
+
     def workflow(self):
         """
-        Build the state graph.
+        Return the compiled state graph, building it on first use.
         START -> supervisor -> (information_node | booking_node | END)
         information_node/booking_node -> supervisor
+        The compiled graph holds no per-request state, so it is shared.
+        Nodes are coroutines: run it with `ainvoke` / `astream`.
+        """
+        if self.app is None:
+            self.app = self.build_graph()
+        return self.app
+
+    def build_graph(self, checkpointer=None):
+        """
+        Build and compile a fresh state graph. With a checkpointer, state is
+        persisted per thread_id (see utils/sessions.py).
         """
         self.graph = StateGraph(AgentState)
         self.graph.add_node("supervisor", self.supervisor_node)
@@ -480,5 +560,4 @@ class DoctorAppointmentAgent:
         self.graph.add_node("booking_node", self.booking_node)
         self.graph.add_edge(START, "supervisor")
         # information_node and booking_node implicitly return to supervisor via goto
-        self.app = self.graph.compile()
-        return self.app
+        return self.graph.compile(checkpointer=checkpointer)
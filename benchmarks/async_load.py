@@ -0,0 +1,91 @@
+"""
+Concurrency of the agent graph with a stub LLM (utils/fake_llm.py).
+
+threadpool: the old deployment model. FastAPI ran sync handlers on a
+            40-thread pool, and a conversation held its thread for the
+            whole turn. The nodes are coroutines now, so each thread runs
+            the graph on its own event loop; the thread-per-turn
+            concurrency limit is what is being compared.
+async     : the current handler. Every conversation is a coroutine on one
+            event loop and LLM waits are awaited.
+
+Each conversation is one turn: supervisor -> information_node -> supervisor.
+The pre-router settles both supervisor passes, so it makes one LLM call
+(the information agent's) of --latency seconds.
+
+All conversations are submitted at once. Latency is measured from
+submission, so time spent waiting for a free thread counts, and is
+reported next to throughput.
+
+    python -m benchmarks.async_load --conversations 400 --latency 0.2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from agent import DoctorAppointmentAgent
+from utils.fake_llm import FakeChatModel
+
+# anyio's default thread limiter, i.e. what served sync FastAPI endpoints
+THREADPOOL_SIZE = 40
+
+
+def _query(i: int) -> dict:
+    return {
+        "messages": [HumanMessage(content="is dr john doe free on 07-08-2024 at 8 am?")],
+        "id_number": 1000000 + i,
+        "next": "",
+        "query": "",
+        "current_reasoning": "",
+        "turns": 0,
+        "last_node": "",
+    }
+
+
+def _report(name: str, n: int, wall: float, latencies: list):
+    latencies = sorted(latencies)
+    print(
+        f"{name:10s} {n:5d} conversations in {wall:7.2f} s   "
+        f"{n / wall:8.1f} conv/s   p50 {statistics.median(latencies):6.2f} s   "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:6.2f} s"
+    )
+
+
+def run_threadpool(graph, n: int):
+    def one(i):
+        asyncio.run(graph.ainvoke(_query(i), config={"recursion_limit": 30}))
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as pool:
+        latencies = list(pool.map(one, range(n)))
+    _report("threadpool", n, time.perf_counter() - start, latencies)
+
+
+async def run_async(graph, n: int):
+    async def one(i):
+        await graph.ainvoke(_query(i), config={"recursion_limit": 30})
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(n)))
+    _report("async", n, time.perf_counter() - start, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stub LLM call")
+    args = parser.parse_args()
+
+    graph = DoctorAppointmentAgent(llm_model=FakeChatModel(latency=args.latency)).workflow()
+    run_threadpool(graph, args.conversations)
+    asyncio.run(run_async(graph, args.conversations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Concurrency stress check for ScheduleStore bookings.
+
+Hammers a single free slot from N threads sharing one store and from N
+processes each holding their own store over the same file, and asserts that
+exactly one booker wins and what is on disk names the winner.
+
+Then races reschedules: patients that each hold an appointment with the same
+doctor all try to move it to the same free slot at once. Exactly one move
+may succeed; every loser must still hold their original slot.
+
+    python -m benchmarks.booking_stress --threads 32 --processes 8
+    python -m benchmarks.booking_stress --backend sqlite
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from toolkit.schedule_store import DEFAULT_CSV_PATH, RescheduleResult, ScheduleStore, patient_id
+from toolkit.sqlite_store import SQLiteScheduleStore, _iso_slot, import_csv
+
+
+def open_store(backend: str, path: str):
+    return SQLiteScheduleStore(path) if backend == "sqlite" else ScheduleStore(path)
+
+
+def _first_free_slot(backend: str, path: str, days: list):
+    store = open_store(backend, path)
+    for date, doctor in days:
+        times = store.available_times(date, doctor)
+        if times:
+            return f"{date} {times[0]}", doctor
+    raise RuntimeError("no free slot left to race for")
+
+
+def _owner_on_disk(backend: str, path: str, slot: str, doctor: str):
+    # a fresh store only sees what is durable
+    if backend == "sqlite":
+        with sqlite3.connect(path) as conn:
+            available, owner = conn.execute(
+                "SELECT is_available, patient_to_attend FROM slots WHERE slot = ? AND doctor_name = ?",
+                (_iso_slot(slot), doctor),
+            ).fetchone()
+        return bool(available), patient_id(owner)
+    df = ScheduleStore(path).df
+    row = df[(df['date_slot'] == slot) & (df['doctor_name'] == doctor)].iloc[0]
+    return bool(row['is_available']), patient_id(row['patient_to_attend'])
+
+
+def run_threads(backend: str, path: str, days: list, n: int):
+    store = open_store(backend, path)
+    slot, doctor = _first_free_slot(backend, path, days)
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        results[i] = store.book(slot, doctor, str(2000000 + i))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    winners = [2000000 + i for i, ok in enumerate(results) if ok]
+    is_available, owner = _owner_on_disk(backend, path, slot, doctor)
+    assert len(winners) == 1, f"threads: expected exactly one winner, got {winners}"
+    assert not is_available and owner == winners[0], f"threads: disk says {owner}, winner {winners[0]}"
+    print(f"threads   : {n} bookers on {slot} / {doctor} -> 1 winner ({winners[0]})")
+
+
+def _process_worker(backend, path, slot, doctor, patient, barrier, results):
+    # every process builds its own store, as a separate uvicorn worker would
+    store = open_store(backend, path)
+    barrier.wait()
+    results[patient] = store.book(slot, doctor, patient)
+
+
+def run_processes(backend: str, path: str, days: list, n: int):
+    slot, doctor = _first_free_slot(backend, path, days)
+    with mp.Manager() as manager:
+        barrier = manager.Barrier(n)
+        results = manager.dict()
+        procs = [
+            mp.Process(target=_process_worker, args=(backend, path, slot, doctor, str(3000000 + i), barrier, results))
+            for i in range(n)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        results = dict(results)
+
+    winners = [patient_id(patient) for patient, ok in results.items() if ok]
+    is_available, owner = _owner_on_disk(backend, path, slot, doctor)
+    assert len(results) == n, f"processes: only {len(results)}/{n} workers reported"
+    assert len(winners) == 1, f"processes: expected exactly one winner, got {winners}"
+    assert not is_available and owner == winners[0], f"processes: disk says {owner}, winner {winners[0]}"
+    print(f"processes : {n} bookers on {slot} / {doctor} -> 1 winner ({winners[0]})")
+
+
+def _free_slots_of_one_doctor(backend: str, path: str, days: list, n: int):
+    """n free slots of a single doctor (any days), for the reschedule race."""
+    store = open_store(backend, path)
+    found = {}
+    for date, doctor in days:
+        found.setdefault(doctor, []).extend(f"{date} {t}" for t in store.available_times(date, doctor))
+        if len(found[doctor]) >= n:
+            return doctor, found[doctor][:n]
+    raise RuntimeError("not enough free slots left to race for")
+
+
+def _check_reschedule_race(name: str, backend: str, path: str, doctor: str, target: str, moves: dict):
+    """moves: {patient: (old_slot, RescheduleResult)}"""
+    winners = [p for p, (_, result) in moves.items() if result == RescheduleResult.RESCHEDULED]
+    assert len(winners) == 1, f"{name}: expected exactly one reschedule, got {winners}"
+    losers = [p for p in moves if p not in winners]
+    assert all(moves[p][1] == RescheduleResult.SLOT_TAKEN for p in losers), f"{name}: unexpected results {moves}"
+
+    store = open_store(backend, path)  # fresh store: only what is durable
+    held = {slot: patient for slot, patient in ((s, p) for p in moves for s, d in store.appointments(p) if d == doctor)}
+    assert held.get(target) == winners[0], f"{name}: target held by {held.get(target)}, winner {winners[0]}"
+    assert store.is_available(moves[winners[0]][0], doctor), f"{name}: winner's old slot was not released"
+    for p in losers:
+        assert held.get(moves[p][0]) == p, f"{name}: patient {p} lost their original slot"
+    print(f"{name:10s}: {len(moves)} patients move to {target} / {doctor} -> 1 winner ({winners[0]}), losers kept their slots")
+
+
+def run_reschedule_threads(backend: str, path: str, days: list, n: int):
+    doctor, slots = _free_slots_of_one_doctor(backend, path, days, n + 1)
+    target, originals = slots[0], slots[1:]
+    store = open_store(backend, path)
+    patients = [4000000 + i for i in range(n)]
+    for patient, slot in zip(patients, originals):
+        assert store.book(slot, doctor, patient)
+    barrier = threading.Barrier(n)
+    moves = {}
+
+    def worker(patient, old_slot):
+        barrier.wait()
+        moves[patient] = (old_slot, store.reschedule(old_slot, target, doctor, patient))
+
+    threads = [threading.Thread(target=worker, args=args) for args in zip(patients, originals)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _check_reschedule_race("reschedule", backend, path, doctor, target, moves)
+
+
+def _process_reschedule_worker(backend, path, old_slot, target, doctor, patient, barrier, results):
+    store = open_store(backend, path)
+    barrier.wait()
+    results[patient] = (old_slot, store.reschedule(old_slot, target, doctor, patient).value)
+
+
+def run_reschedule_processes(backend: str, path: str, days: list, n: int):
+    doctor, slots = _free_slots_of_one_doctor(backend, path, days, n + 1)
+    target, originals = slots[0], slots[1:]
+    store = open_store(backend, path)
+    patients = [5000000 + i for i in range(n)]
+    for patient, slot in zip(patients, originals):
+        assert store.book(slot, doctor, patient)
+    with mp.Manager() as manager:
+        barrier = manager.Barrier(n)
+        results = manager.dict()
+        procs = [
+            mp.Process(target=_process_reschedule_worker, args=(backend, path, slot, target, doctor, patient, barrier, results))
+            for patient, slot in zip(patients, originals)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        moves = {patient: (slot, RescheduleResult(result)) for patient, (slot, result) in results.items()}
+    assert len(moves) == n, f"reschedule processes: only {len(moves)}/{n} workers reported"
+    _check_reschedule_race("reschedule processes", backend, path, doctor, target, moves)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="schedule to copy (never modified)")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "doctor_availability.csv")
+        shutil.copy(args.csv, csv_path)
+        df = ScheduleStore(csv_path).df
+        days = [(d.strftime("%d-%m-%Y"), doc) for d, doc in df[['date', 'doctor_name']].drop_duplicates().values]
+        path = csv_path
+        if args.backend == "sqlite":
+            path = os.path.join(tmp, "doctor_availability.db")
+            import_csv(csv_path, path)
+        for _ in range(args.rounds):
+            run_threads(args.backend, path, days, args.threads)
+            run_processes(args.backend, path, days, args.processes)
+            run_reschedule_threads(args.backend, path, days, max(2, args.threads // 4))
+            run_reschedule_processes(args.backend, path, days, max(2, args.processes // 2))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
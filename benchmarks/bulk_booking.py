@@ -0,0 +1,81 @@
+"""
+Bookings per second importing a day's worth of phone bookings: one book()
+call per appointment (what set_appointment does) against one book_many()
+batch, on a temporary copy of the schedule.
+
+A fresh store is opened afterwards to check that every booking reported as
+BOOKED is durable, and that the batch's deliberate conflicts (a taken slot,
+a duplicate and an unknown slot) were reported and not applied.
+
+    python -m benchmarks.bulk_booking --count 1000
+    python -m benchmarks.bulk_booking --backend sqlite
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from toolkit.schedule_store import DEFAULT_CSV_PATH, BookingResult, ScheduleStore
+from toolkit.sqlite_store import SQLiteScheduleStore, import_csv
+
+
+def open_store(backend: str, path: str):
+    return SQLiteScheduleStore(path) if backend == "sqlite" else ScheduleStore(path)
+
+
+def free_slots(store, days: list) -> list:
+    return [(f"{date} {t}", doctor) for date, doctor in days for t in store.available_times(date, doctor)]
+
+
+def run(backend: str, csv_source: str, count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "doctor_availability.csv")
+        shutil.copy(csv_source, csv_path)
+        path = csv_path
+        if backend == "sqlite":
+            path = os.path.join(tmp, "doctor_availability.db")
+            import_csv(csv_path, path)
+        df = ScheduleStore(csv_path).df
+        days = [(d.strftime("%d-%m-%Y"), doc) for d, doc in df[['date', 'doctor_name']].drop_duplicates().values]
+
+        store = open_store(backend, path)
+        slots = free_slots(store, days)
+        if len(slots) < 2 * count + 1:
+            raise SystemExit(f"only {len(slots)} free slots; use a smaller --count")
+        single, batch, taken = slots[:count], slots[count:2 * count], slots[2 * count]
+
+        start = time.perf_counter()
+        for i, (slot, doctor) in enumerate(single):
+            assert store.book(slot, doctor, 6000000 + i)
+        single_rate = count / (time.perf_counter() - start)
+
+        assert store.book(*taken, 6999999)
+        items = [(slot, doctor, 7000000 + i) for i, (slot, doctor) in enumerate(batch)]
+        items += [(taken[0], taken[1], 7999998), (batch[0][0], batch[0][1], 7999999), ("01-01-1999 08:00", "john doe", 7999997)]
+        start = time.perf_counter()
+        results = store.book_many(items)
+        batch_rate = count / (time.perf_counter() - start)
+
+        assert results[:count] == [BookingResult.BOOKED] * count, "batch: expected every fresh slot to be booked"
+        assert results[count:] == [BookingResult.SLOT_TAKEN, BookingResult.DUPLICATE, BookingResult.UNKNOWN_SLOT], results[count:]
+        fresh = open_store(backend, path)  # only what is durable
+        for slot, doctor, patient in items[:count]:
+            assert (slot, doctor) in fresh.appointments(patient), f"{slot} / {doctor} for {patient} not on disk"
+        assert not fresh.appointments(7999998) and not fresh.appointments(7999999)
+
+    print(f"{backend:6s} {count:6d} bookings   book(): {single_rate:9.0f}/s   book_many(): {batch_rate:9.0f}/s   "
+          f"x{batch_rate / single_rate:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="schedule to copy (never modified)")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+    run(args.backend, args.csv, args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Memory and query time of the compact schedule (toolkit/columnar.py, what
+ScheduleStore holds) against the normalised pandas DataFrame the store used
+to keep, at multiples of the demo CSV.
+
+The demo schedule is repeated `scale` times, each copy moved past the last
+(--mode days: years of one clinic's schedule) or given its own doctors
+(--mode clinics: many clinics over the same month). Memory is what stays
+allocated after loading (tracemalloc). Queries are answered from the
+DataFrame with boolean masks, and from the store:
+  doctor_day      free times of a doctor on a day
+  specialization  free times of every doctor of a specialization on a day
+  slot            is one doctor's slot free
+  mornings        days in a 30-day range where a doctor has a free slot before 12:00
+
+    python -m benchmarks.columnar_schedule --scales 1 10 100
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from toolkit.schedule_store import CSV_COLUMNS, DEFAULT_CSV_PATH, ScheduleStore, normalise_schedule
+
+
+def scaled_csv(source: str, scale: int, mode: str, path: str):
+    raw = pd.read_csv(source, dtype={"patient_to_attend": object})
+    slot = pd.to_datetime(raw['date_slot'], format="%d-%m-%Y %H:%M")
+    span = (slot.max().normalize() - slot.min().normalize()).days + 1
+    copies = []
+    for i in range(scale):
+        copy = raw.copy()
+        if mode == "days":
+            copy['date_slot'] = (slot + pd.Timedelta(days=i * span)).dt.strftime("%d-%m-%Y %H:%M")
+        elif i:
+            copy['doctor_name'] = copy['doctor_name'] + f" {i}"
+        copies.append(copy)
+    pd.concat(copies)[CSV_COLUMNS].to_csv(path, index=False)
+
+
+def retained(build):
+    """(object, bytes still allocated after build() returns)."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def per_query(fn, queries: list) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def run(source: str, scale: int, mode: str, n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedule.csv")
+        scaled_csv(source, scale, mode, path)
+        df, df_bytes = retained(
+            lambda: normalise_schedule(pd.read_csv(path, dtype={"patient_to_attend": object}))[0]
+        )
+        store, store_bytes = retained(lambda: ScheduleStore(path, compact_every=0))
+
+    rng = random.Random(scale)
+    days = sorted(df['date'].unique())
+    doctors = store.doctors()
+    specializations = sorted(set(doctors.values()))
+    day_queries = [(rng.choice(days), rng.choice(list(doctors))) for _ in range(n)]
+    specialization_queries = [(rng.choice(days), rng.choice(specializations)) for _ in range(n)]
+    slot_queries = [(d, pd.Timestamp(d) + pd.Timedelta(minutes=rng.choice(range(8 * 60, 17 * 60, 30))), doc)
+                    for d, doc in day_queries]
+    morning_queries = [(d, d + pd.Timedelta(days=29), doc) for d, doc in day_queries]
+
+    def fmt(d):
+        return d.strftime("%d-%m-%Y")
+
+    def df_doctor_day(d, doc):
+        rows = df[(df['date'] == d) & (df['doctor_name'] == doc) & df['is_available']]
+        return rows['slot'].dt.strftime("%H:%M").tolist()
+
+    def df_specialization(d, spec):
+        rows = df[(df['date'] == d) & (df['specialization'] == spec) & df['is_available']]
+        return rows.groupby('doctor_name')['slot'].apply(lambda s: s.dt.strftime("%H:%M").tolist()).to_dict()
+
+    def df_slot(d, slot, doc):
+        return bool(((df['slot'] == slot) & (df['doctor_name'] == doc) & df['is_available']).any())
+
+    def df_mornings(first, last, doc):
+        rows = df[(df['date'] >= first) & (df['date'] <= last) & (df['doctor_name'] == doc)
+                  & df['is_available'] & (df['slot'].dt.hour < 12)]
+        return sorted(rows['date'].unique())
+
+    timings = {
+        "doctor_day": (per_query(df_doctor_day, day_queries[:n // 10 or 1]),
+                       per_query(lambda d, doc: store.available_times(fmt(d), doc), day_queries)),
+        "specialization": (per_query(df_specialization, specialization_queries[:n // 10 or 1]),
+                           per_query(lambda d, spec: store.available_by_specialization(fmt(d), spec), specialization_queries)),
+        "slot": (per_query(df_slot, slot_queries[:n // 10 or 1]),
+                 per_query(lambda d, slot, doc: store.is_available(slot.strftime("%d-%m-%Y %H:%M"), doc), slot_queries)),
+        "mornings": (per_query(df_mornings, morning_queries[:n // 10 or 1]),
+                     per_query(lambda first, last, doc: store.available_in_range(fmt(first), fmt(last), doctor_name=doc, time_to="12:00"),
+                               morning_queries)),
+    }
+
+    columns = store._columns
+    print(f"scale {scale:4d} ({mode}): {len(columns):8d} rows, {len(doctors)} doctors, {columns.days} days")
+    print(f"  memory      DataFrame {df_bytes / 2**20:8.1f} MiB   store {store_bytes / 2**20:8.1f} MiB "
+          f"(arrays {columns.nbytes() / 2**20:.1f} MiB)   x{df_bytes / store_bytes:.0f} smaller")
+    for name, (before, after) in timings.items():
+        print(f"  {name:15s} DataFrame {before:9.1f} us   store {after:7.1f} us   x{before / after:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="schedule to scale (never modified)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--mode", choices=["days", "clinics"], default="days")
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    for scale in args.scales:
+        run(args.csv, scale, args.mode, args.queries)
+
+
+if __name__ == "__main__":
+    main()
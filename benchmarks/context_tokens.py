@@ -0,0 +1,95 @@
+"""
+Prompt tokens per turn against conversation length, with the full history
+sent to every LLM call (CONTEXT_KEEP_TURNS=0, the old behaviour) and with
+the windowed + summarised context from utils/context.py.
+
+A conversation of N earlier turns is replayed as history and one more turn
+is run through workflow() with the stub LLM; the prompt of every LLM call in
+that turn (supervisor routing and the information agent) is counted with
+langchain_core's approximate token counter. The pre-router is off so the
+supervisor prompt is counted too.
+
+    python -m benchmarks.context_tokens --lengths 1 5 10 20 40
+"""
+import argparse
+import asyncio
+from typing import Any, List
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from pydantic import Field
+
+from agent import DoctorAppointmentAgent
+from utils.fake_llm import FakeChatModel
+
+DOCTORS = ["john doe", "emily johnson", "jane smith", "lisa brown", "michael green"]
+
+
+class RecordingChatModel(FakeChatModel):
+    """FakeChatModel that records the approximate prompt size of every call."""
+
+    prompt_tokens: List[int] = Field(default_factory=list)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        self.prompt_tokens.append(count_tokens_approximately(messages))
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def history(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        doctor = DOCTORS[i % len(DOCTORS)]
+        day = f"{5 + i % 5:02d}-08-2024"
+        hour = 8 + i % 3
+        messages.append(HumanMessage(content=f"Is Dr. {doctor.title()} available on {day} at {hour} AM?"))
+        messages.append(AIMessage(
+            content=f"Dr. {doctor.title()} is available on {day} at {hour} AM, "
+                    f"and also at {hour}:30 AM and {hour + 1} AM. Should I book one of these?",
+            name="information_node",
+        ))
+    return messages
+
+
+async def turn_tokens(agent: DoctorAppointmentAgent, model: RecordingChatModel, turns: int) -> tuple[int, int]:
+    model.prompt_tokens.clear()
+    await agent.workflow().ainvoke(
+        {
+            "messages": history(turns) + [HumanMessage(content="Is Dr. John Doe available on 07-08-2024 at 8 AM?")],
+            "id_number": 1234567,
+            "next": "",
+            "query": "",
+            "current_reasoning": "",
+            "turns": 0,
+            "last_node": "",
+        },
+        config={"recursion_limit": 30},
+    )
+    return sum(model.prompt_tokens), len(model.prompt_tokens)
+
+
+async def run(lengths: list, keep_turns: int):
+    rows = {}
+    for label, keep in (("full", 0), ("windowed", keep_turns)):
+        model = RecordingChatModel()
+        agent = DoctorAppointmentAgent(llm_model=model, pre_router=False)
+        agent.context_turns = keep
+        agent.response_cache.max_entries = 0  # every turn must reach the LLM
+        for n in lengths:
+            rows.setdefault(n, {})[label] = await turn_tokens(agent, model, n)
+
+    print(f"{'earlier turns':>13s} {'LLM calls':>9s} {'full':>8s} {'windowed':>9s} {'saved':>6s}")
+    for n in lengths:
+        (full, calls), (windowed, _) = rows[n]["full"], rows[n]["windowed"]
+        print(f"{n:13d} {calls:9d} {full:8d} {windowed:9d} {1 - windowed / full:6.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    parser.add_argument("--keep-turns", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.lengths, args.keep_turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+End-to-end latency of patient turns without network access: scripted
+conversations replayed through DoctorAppointmentAgent.workflow() (--target
+graph) and through main.execute_agent, the /execute handler (--target api),
+with LLM_PROVIDER=fake (utils/fake_llm.py, tool-using mode) against a
+temporary copy of the schedule.
+
+Every turn is timed end to end; a LangChain callback handler counts the
+LLM calls and tool calls it made and times each graph node, including the
+nodes of the ReAct workers (information_node/agent, .../tools). Reports
+p50/p95/p99 per target; --json writes every turn too.
+
+    python -m benchmarks.e2e_latency --latency 0.05 --repeat 3
+    python -m benchmarks.e2e_latency --target api --latency 0 --json /tmp/e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+from multiprocessing import get_context
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from toolkit.schedule_store import DEFAULT_CSV_PATH
+
+# {day} is replaced per repeat so later repeats book free slots, not taken ones
+CONVERSATIONS = [
+    ["is dr john doe available on {day} at 8 am?", "yes please book it", "thanks"],
+    ["what slots does emily johnson have on {day}?", "book 9:00 on {day} with emily johnson"],
+    ["i need a general dentist on {day}", "any availability at 2 pm?"],
+    ["can you book me with sarah wilson on {day} at 10:30?", "what are my appointments?"],
+    ["book an appointment with dr lisa brown on {day} at 14:00",
+     "reschedule my appointment with lisa brown to {day} 15:00", "cancel my appointment with lisa brown"],
+    ["anything with kevin anderson between {day} and {day_after}?"],
+    ["hello", "when is dr michael green available on {day}?"],
+    ["any orthodontist on {day}?", "is 11 am open?"],
+]
+FIRST_DAY = 5  # August 2024, the demo schedule's first day
+
+_recorder = ContextVar("e2e_latency_recorder", default=None)
+register_configure_hook(_recorder, inheritable=True)
+
+
+class TurnRecorder(BaseCallbackHandler):
+    """LLM calls, tool calls and node timings of the runs it sees."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.nodes = []  # (node label, seconds)
+        self._started = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        if kwargs.get("name") not in (None, "__start__") and kwargs["name"] == metadata.get("langgraph_node"):
+            # "information_node:<id>|agent:<id>" -> "information_node/agent"
+            namespace = metadata.get("langgraph_checkpoint_ns", kwargs["name"])
+            label = "/".join(part.split(":")[0] for part in namespace.split("|"))
+            self._started[run_id] = (label, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            self.nodes.append((started[0], time.perf_counter() - started[1]))
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.tool_calls += 1
+
+
+def conversations(repeat: int) -> list:
+    """(patient ID, turns) for every conversation of every repeat."""
+    result = []
+    for r in range(repeat):
+        day, day_after = (f"{FIRST_DAY + (r + i) % 25:02d}-08-2024" for i in (0, 3))
+        for i, turns in enumerate(CONVERSATIONS):
+            result.append((1000000 + r * 100 + i, [t.format(day=day, day_after=day_after) for t in turns]))
+    return result
+
+
+async def replay(target: str, repeat: int) -> list:
+    if target == "graph":
+        from agent import DoctorAppointmentAgent
+
+        graph = DoctorAppointmentAgent().workflow()
+
+        async def turn(id_number, text, history):
+            from langchain_core.messages import HumanMessage
+
+            result = await graph.ainvoke(
+                {"messages": history + [HumanMessage(content=text)], "id_number": id_number, "next": "",
+                 "query": "", "current_reasoning": "", "turns": 0, "last_node": ""},
+                config={"recursion_limit": 30},
+            )
+            return result["messages"]
+    else:
+        import main
+
+        async def turn(id_number, text, history):
+            response = await main.execute_agent(
+                main.UserQuery(id_number=id_number, message=text, conversation_history=history)
+            )
+            return response["conversation_history"]
+
+    records = []
+    for id_number, texts in conversations(repeat):
+        history = []
+        for text in texts:
+            recorder = TurnRecorder()
+            token = _recorder.set(recorder)
+            start = time.perf_counter()
+            try:
+                history = await turn(id_number, text, history)
+            finally:
+                _recorder.reset(token)
+            records.append({
+                "message": text,
+                "seconds": time.perf_counter() - start,
+                "llm_calls": recorder.llm_calls,
+                "tool_calls": recorder.tool_calls,
+                "nodes": recorder.nodes,
+            })
+    return records
+
+
+def run_target(target: str, latency: float, jitter: float, repeat: int, seed: int) -> list:
+    """Replay every conversation against a fresh schedule; runs in its own process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "SCHEDULE_CSV_PATH": os.path.join(tmp, "doctor_availability.csv"),
+            "LLM_PROVIDER": "fake",
+            "FAKE_LLM_LATENCY": str(latency),
+            "FAKE_LLM_JITTER": str(jitter),
+            "FAKE_LLM_SEED": str(seed),
+            "FAKE_LLM_TOOLS": "1",
+        })
+        # per-turn log lines would interleave with the report; LOG_LEVEL=DEBUG still shows them
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        shutil.copy(DEFAULT_CSV_PATH, os.environ["SCHEDULE_CSV_PATH"])
+        return asyncio.run(replay(target, repeat))
+
+
+def percentiles(values: list) -> dict:
+    if len(values) < 2:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]} if values else {}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": statistics.median(values), "p95": cuts[94], "p99": cuts[98]}
+
+
+def summarize(records: list) -> dict:
+    latencies = [r["seconds"] for r in records]
+    per_node = defaultdict(list)
+    for r in records:
+        for label, seconds in r["nodes"]:
+            per_node[label].append(seconds)
+    return {
+        "turns": len(records),
+        "latency": {**percentiles(latencies), "mean": statistics.fmean(latencies), "max": max(latencies)},
+        "llm_calls_per_turn": {
+            "mean": statistics.fmean(r["llm_calls"] for r in records),
+            "max": max(r["llm_calls"] for r in records),
+            "histogram": dict(sorted(Counter(r["llm_calls"] for r in records).items())),
+        },
+        "tool_calls_per_turn": {
+            "mean": statistics.fmean(r["tool_calls"] for r in records),
+            "max": max(r["tool_calls"] for r in records),
+            "histogram": dict(sorted(Counter(r["tool_calls"] for r in records).items())),
+        },
+        "nodes": {
+            label: {"calls": len(seconds), "mean": statistics.fmean(seconds), **percentiles(seconds)}
+            for label, seconds in sorted(per_node.items())
+        },
+    }
+
+
+def print_summary(target: str, summary: dict):
+    latency = summary["latency"]
+    print(f"{target}: {summary['turns']} turns")
+    print(f"  end-to-end       p50 {latency['p50'] * 1e3:8.1f} ms   p95 {latency['p95'] * 1e3:8.1f} ms   "
+          f"p99 {latency['p99'] * 1e3:8.1f} ms   max {latency['max'] * 1e3:8.1f} ms")
+    for key in ("llm_calls_per_turn", "tool_calls_per_turn"):
+        counts = summary[key]
+        print(f"  {key.replace('_', ' '):16s} mean {counts['mean']:.2f}   max {counts['max']}   "
+              f"turns by count {counts['histogram']}")
+    print(f"  {'node':36s} {'calls':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for label, node in summary["nodes"].items():
+        print(f"  {label:36s} {node['calls']:6d} {node['p50'] * 1e3:6.1f} ms {node['p95'] * 1e3:6.1f} ms "
+              f"{node['p99'] * 1e3:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["graph", "api"], nargs="+", default=["graph", "api"])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+- fraction of --latency")
+    parser.add_argument("--repeat", type=int, default=3, help="times the conversations are replayed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the summaries and every turn to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.target:
+        # a fresh interpreter and schedule per target: the store is a process-wide singleton
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            records = pool.submit(run_target, target, args.latency, args.jitter, args.repeat, args.seed).result()
+        results[target] = {"summary": summarize(records), "turns": records}
+        print_summary(target, results[target]["summary"])
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"params": vars(args), "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
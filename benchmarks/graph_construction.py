@@ -0,0 +1,56 @@
+"""
+Per-request construction overhead of the agent graph.
+
+Before: every POST /execute compiled a new StateGraph and every worker
+visit built its ReAct agent (prompt template + create_react_agent).
+After: both are compiled once per process and reused.
+
+No LLM call is made; a placeholder GROQ_API_KEY is enough to build the client.
+
+    python -m benchmarks.graph_construction --requests 200
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "not-used-by-this-benchmark")
+
+from agent import DoctorAppointmentAgent
+
+
+def _time_per_call(fn, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    agent = DoctorAppointmentAgent()
+
+    def before():
+        # what a turn used to pay: graph compile + the ReAct workers it visits
+        agent.build_graph()
+        agent.build_sub_agents()
+
+    def after():
+        agent.workflow()
+
+    agent.workflow()  # warm the cache, as main.py does at import time
+    for name, fn in [("before (rebuild per request)", before), ("after (compiled once)", after)]:
+        samples = _time_per_call(fn, args.requests)
+        print(
+            f"{name:30s} mean {statistics.mean(samples):8.3f} ms   "
+            f"p95 {sorted(samples)[int(len(samples) * 0.95) - 1]:8.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
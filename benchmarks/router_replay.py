@@ -0,0 +1,163 @@
+"""
+Supervisor LLM calls with and without the deterministic pre-router
+(utils/router.py), replayed over a small corpus of recorded patient turns.
+
+Each conversation is replayed turn by turn through workflow() the way the
+stateless /execute endpoint does it (full history in, history out), with the
+stub LLM from utils/fake_llm.py, against a temporary copy of the schedule.
+Only the supervisor's routing calls are counted. Before replaying, the
+replies in CONFIRMATIONS are checked against confirms_offer(): a reply
+wrongly taken for a "yes" would be booked without asking the LLM.
+
+    python -m benchmarks.router_replay
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from agent import DoctorAppointmentAgent
+from toolkit.schedule_store import DEFAULT_CSV_PATH
+from utils.fake_llm import FakeChatModel
+from utils.router import confirms_offer, pre_route, router_stats, ROUTER_CONFIDENCE
+
+CORPUS = [
+    ["is dr john doe available on 07-08-2024 at 8 am?", "yes please book it"],
+    ["what slots does emily johnson have on 05-08-2024?", "ok book 9:00", "thanks"],
+    ["i need a general dentist on 08-08-2024", "any availability in the afternoon?"],
+    ["please cancel my appointment with dr jane smith on 06-08-2024 08:30"],
+    ["reschedule my appointment with kevin anderson from 07-08-2024 09:00 to 08-08-2024 10:00"],
+    ["can you book me with sarah wilson on 05-08-2024 at 10:30?", "sure"],
+    ["who is free for orthodontics tomorrow?", "is 11 am open?", "go ahead"],
+    ["book an appointment with dr lisa brown on 09-08-2024 at 14:00"],
+    ["hello", "when is dr michael green available on 07-08-2024?"],
+    ["i want to change my appointment", "to 09-08-2024 at 9", "yes"],
+    ["any cosmetic dentist available on 10-08-2024?", "yep"],
+    ["what about pediatric dentistry?", "okay book the first one"],
+]
+
+OFFER = "Dr. John Doe is available on 07-08-2024 at 8 AM. Should I book it?"
+# reply to OFFER -> whether it is a confirmation
+CONFIRMATIONS = [
+    ("yes", True),
+    ("yes please book it", True),
+    ("ok", True),
+    ("sure, go ahead", True),
+    ("Perfect!", True),
+    ("yep book it", True),
+    ("No, please don't", False),
+    ("no thanks, go elsewhere", False),
+    ("ok but not 8 am", False),
+    ("please", False),
+    ("don't book it", False),
+    ("nope", False),
+    ("yes but on another day", False),
+    ("sure, what else is available?", False),
+    ("great, can you cancel my other one instead", False),
+]
+
+
+def check_confirmations() -> int:
+    """Raise if confirms_offer() misreads a reply in CONFIRMATIONS; returns the number checked."""
+    wrong = [
+        (reply, expected) for reply, expected in CONFIRMATIONS
+        if confirms_offer([AIMessage(content=OFFER), HumanMessage(content=reply)]) != expected
+    ]
+    if wrong:
+        raise AssertionError(f"confirms_offer misreads (reply, expected): {wrong}")
+    # a reply that doesn't follow an offer is never a confirmation
+    assert not confirms_offer([AIMessage(content="Booked."), HumanMessage(content="yes")])
+    return len(CONFIRMATIONS)
+
+
+class CountingRouter:
+    """Wraps the supervisor's structured-output runnable and counts calls."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.calls = 0
+
+    def runnable(self):
+        def route(messages, config=None):
+            self.calls += 1
+            return self.inner.invoke(messages, config)
+
+        async def aroute(messages, config=None):
+            self.calls += 1
+            return await self.inner.ainvoke(messages, config)
+
+        return RunnableLambda(route, afunc=aroute)
+
+
+async def replay(pre_router: bool) -> tuple[int, int]:
+    agent = DoctorAppointmentAgent(llm_model=FakeChatModel(), pre_router=pre_router)
+    counter = CountingRouter(agent.router_llm)
+    agent.router_llm = counter.runnable()
+    graph = agent.workflow()
+
+    turns = 0
+    for i, conversation in enumerate(CORPUS):
+        history = []
+        for text in conversation:
+            result = await graph.ainvoke(
+                {
+                    "messages": history + [HumanMessage(content=text)],
+                    "id_number": 1000000 + i,
+                    "next": "",
+                    "query": "",
+                    "current_reasoning": "",
+                    "turns": 0,
+                    "last_node": "",
+                },
+                config={"recursion_limit": 30},
+            )
+            history = result["messages"]
+            turns += 1
+    return turns, counter.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    checked = check_confirmations()
+
+    # confirmed offers are booked, so replay against a copy of the schedule
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SCHEDULE_CSV_PATH"] = os.path.join(tmp, "doctor_availability.csv")
+        shutil.copy(DEFAULT_CSV_PATH, os.environ["SCHEDULE_CSV_PATH"])
+        turns, before = asyncio.run(replay(pre_router=False))
+        router_stats.reset()
+        _, after = asyncio.run(replay(pre_router=True))
+        stats = router_stats.snapshot()
+
+    # how the opening turn of each conversation is classified on its own
+    openings = [pre_route([HumanMessage(content=c[0])]) for c in CORPUS]
+    confident = sum(d.confidence >= ROUTER_CONFIDENCE for d in openings)
+
+    result = {
+        "confirmations_checked": checked,
+        "conversations": len(CORPUS),
+        "turns": turns,
+        "router_llm_calls_before": before,
+        "router_llm_calls_after": after,
+        "llm_calls_saved": before - after,
+        "saved_ratio": round((before - after) / before, 3) if before else 0.0,
+        "confident_openings": f"{confident}/{len(openings)}",
+        "fast_path_by_reason": stats["fast_path_by_reason"],
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key:26s} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Synthetic doctor schedules in the format of data/doctor_availability.csv,
+for trying the toolkit at sizes the demo data doesn't reach.
+
+Every doctor gets a slot every `slot_minutes` between `day_start` and
+`day_end` on each day. How full a doctor's day is varies around
+`occupancy` (some days nearly empty, some nearly full), mornings fill up a
+little faster than afternoons, and booked slots go to a pool of `patients`
+7-digit IDs from PATIENT_IDS. IDs from 9000000 up never appear, so
+benchmarks can book with them.
+
+    python -m benchmarks.schedule_generator --rows 100000 --out /tmp/schedule.csv
+    python -m benchmarks.schedule_generator --doctors 40 --days 90 --slot-minutes 15 --occupancy 0.7 --out /tmp/busy.csv
+"""
+import argparse
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from toolkit.schedule_store import CSV_COLUMNS, SLOT_FORMAT
+
+SPECIALIZATIONS = [
+    "general_dentist", "cosmetic_dentist", "prosthodontist", "pediatric_dentist",
+    "emergency_dentist", "oral_surgeon", "orthodontist",
+]
+FIRST_NAMES = [
+    "john", "emily", "jane", "lisa", "michael", "sarah", "daniel", "susan", "robert", "kevin",
+    "maria", "david", "laura", "james", "anna", "thomas", "nina", "peter", "olivia", "samuel",
+]
+LAST_NAMES = [
+    "doe", "johnson", "smith", "brown", "green", "wilson", "miller", "davis", "martinez", "anderson",
+    "taylor", "thomas", "moore", "white", "harris", "clark", "lewis", "walker", "young", "king",
+]
+# patients of generated bookings; IDs from PATIENT_IDS.stop up are free for the benchmarks' own
+PATIENT_IDS = range(1000000, 9000000)
+
+
+def doctor_names(n: int) -> list:
+    """n distinct lower-case "first last" names, numbered once the combinations run out."""
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    return [names[i % len(names)] + (f" {i // len(names) + 1}" if i >= len(names) else "") for i in range(n)]
+
+
+def slots_per_day(day_start: str = "08:00", day_end: str = "17:00", slot_minutes: int = 30) -> int:
+    start, end = (datetime.strptime(t, "%H:%M") for t in (day_start, day_end))
+    return int((end - start).total_seconds() // 60) // slot_minutes
+
+
+def doctors_for_rows(rows: int, days: int, per_day: int, minimum: int = 10) -> int:
+    """Doctors needed for about `rows` slots over `days` days."""
+    return max(minimum, math.ceil(rows / (days * per_day)))
+
+
+def generate_schedule(doctors: int = 10, specializations: list = None, days: int = 30, start: str = "05-08-2024",
+                      day_start: str = "08:00", day_end: str = "17:00", slot_minutes: int = 30,
+                      occupancy: float = 0.4, patients: int = 1000, weekdays_only: bool = False,
+                      seed: int = 0) -> pd.DataFrame:
+    """A schedule DataFrame with the CSV's columns (see module docstring)."""
+    rng = np.random.default_rng(seed)
+    specializations = specializations or SPECIALIZATIONS
+    names = np.array(doctor_names(doctors))
+    # every specialization has someone before any gets a second doctor
+    specialization_of = np.array(specializations)[rng.permutation(doctors) % len(specializations)]
+
+    dates = pd.date_range(pd.to_datetime(start, format="%d-%m-%Y"), periods=days, freq="B" if weekdays_only else "D")
+    per_day = slots_per_day(day_start, day_end, slot_minutes)
+    first_minute = datetime.strptime(day_start, "%H:%M").hour * 60 + datetime.strptime(day_start, "%H:%M").minute
+    offsets = pd.to_timedelta(first_minute + slot_minutes * np.arange(per_day), unit="m")
+
+    # rows ordered doctor, day, time - like the demo CSV
+    doctor = np.repeat(np.arange(doctors), len(dates) * per_day)
+    day = np.tile(np.repeat(np.arange(len(dates)), per_day), doctors)
+    slot_of_day = np.tile(np.arange(per_day), doctors * len(dates))
+    slot = dates.values[day] + offsets.values[slot_of_day]
+
+    # how full each doctor-day is varies around `occupancy`; mornings a bit more so
+    concentration = 4.0
+    occupancy = min(max(occupancy, 1e-3), 1 - 1e-3)
+    day_fill = rng.beta(occupancy * concentration, (1 - occupancy) * concentration, size=(doctors, len(dates)))
+    morning = 1.2 - 0.4 * slot_of_day / max(per_day - 1, 1)
+    booked = rng.random(len(slot)) < np.clip(day_fill[doctor, day] * morning, 0, 1)
+
+    patient_ids = PATIENT_IDS.start + rng.choice(len(PATIENT_IDS), size=patients, replace=False)
+    patient = np.where(booked, patient_ids[rng.integers(0, patients, size=len(slot))], -1)
+    return pd.DataFrame({
+        'date_slot': pd.DatetimeIndex(slot).strftime(SLOT_FORMAT),
+        'specialization': specialization_of[doctor],
+        'doctor_name': names[doctor],
+        'is_available': ~booked,
+        'patient_to_attend': pd.array(np.where(booked, patient, None), dtype="Int64"),
+    })[CSV_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="CSV file to write")
+    parser.add_argument("--rows", type=int, help="about this many slots; sets --doctors from --days")
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--specializations", nargs="+", default=SPECIALIZATIONS)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--start", default="05-08-2024", help="first day, DD-MM-YYYY")
+    parser.add_argument("--day-start", default="08:00")
+    parser.add_argument("--day-end", default="17:00")
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--occupancy", type=float, default=0.4, help="average share of booked slots")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--weekdays-only", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    doctors = args.doctors
+    if args.rows:
+        doctors = doctors_for_rows(args.rows, args.days, slots_per_day(args.day_start, args.day_end, args.slot_minutes))
+    df = generate_schedule(
+        doctors=doctors, specializations=args.specializations, days=args.days, start=args.start,
+        day_start=args.day_start, day_end=args.day_end, slot_minutes=args.slot_minutes,
+        occupancy=args.occupancy, patients=args.patients, weekdays_only=args.weekdays_only, seed=args.seed,
+    )
+    df.to_csv(args.out, index=False)
+    print(f"Wrote {len(df)} slots for {doctors} doctors over {args.days} days to {args.out} "
+          f"({(~df['is_available']).mean():.0%} booked).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Times every tool in toolkit/toolkits.py against generated schedules of
+10k, 100k and 1M slots (benchmarks/schedule_generator.py), read paths and
+booking paths, and reports pytest-benchmark style statistics.
+
+Each size runs in a fresh process with its own temporary schedule, so the
+shared store (get_schedule_store()) is built from that schedule; the time
+to load it is reported too. Tools are called through .invoke(), as the
+agents call them. Booking cases book, list, reschedule and cancel
+`--rounds` distinct appointments in that order.
+
+    python -m benchmarks.toolkit_scale --json results/toolkit_scale.json
+    python -m benchmarks.toolkit_scale --sizes 10000 --backend sqlite --compare results/toolkit_scale.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import pandas as pd
+
+from benchmarks.schedule_generator import PATIENT_IDS, doctors_for_rows, generate_schedule, slots_per_day
+
+START = "05-08-2024"  # first generated day
+
+
+def stats(samples: list) -> dict:
+    """pytest-benchmark's fields, in seconds."""
+    ordered = sorted(samples)
+    q1, median, q3 = statistics.quantiles(ordered, n=4) if len(ordered) > 1 else (ordered[0],) * 3
+    mean = statistics.fmean(ordered)
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "median": median,
+        "iqr": q3 - q1,
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "rounds": len(ordered),
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+def timed(tool, inputs: list, warmup: int = 0) -> dict:
+    for args in inputs[:warmup]:
+        tool.invoke(args)
+    samples = []
+    for args in inputs:
+        start = time.perf_counter()
+        tool.invoke(args)
+        samples.append(time.perf_counter() - start)
+    return stats(samples)
+
+
+def run_size(rows: int, backend: str, days: int, rounds: int, seed: int) -> list:
+    """All cases for one schedule size; runs in its own process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "schedule.csv")
+        doctors = doctors_for_rows(rows, days, slots_per_day())
+        schedule = generate_schedule(doctors=doctors, days=days, start=START, seed=seed)
+        schedule.to_csv(csv_path, index=False)
+        generated = len(schedule)
+        del schedule
+        os.environ.update({
+            "SCHEDULE_CSV_PATH": csv_path,
+            "SCHEDULE_DB_PATH": os.path.join(tmp, "schedule.db"),
+            "SCHEDULE_BACKEND": backend,
+        })
+
+        from toolkit import toolkits
+        from toolkit.schedule_store import get_schedule_store
+
+        start = time.perf_counter()
+        store = get_schedule_store()
+        results = [("load", "load", stats([time.perf_counter() - start]))]
+
+        rng = random.Random(seed)
+        roster = store.doctors()
+        names, specializations = sorted(roster), sorted(set(roster.values()))
+        dates = [d.strftime("%d-%m-%Y") for d in pd.date_range(pd.to_datetime(START, format="%d-%m-%Y"), periods=days)]
+        times = [f"{8 + i // 2:02d}:{30 * (i % 2):02d}" for i in range(slots_per_day())]
+
+        def sample(n, free, doctor=None, exclude=()):
+            """n distinct (date, time, doctor) with the slot free / taken."""
+            found = []
+            while len(found) < n:
+                pick = (rng.choice(dates), rng.choice(times), doctor or rng.choice(names))
+                if pick not in found and pick not in exclude and store.is_available(f"{pick[0]} {pick[1]}", pick[2]) == free:
+                    found.append(pick)
+            return found
+
+        def day_doctor():
+            return {"date": rng.choice(dates), "doctor_name": rng.choice(names)}
+
+        def day_specialization():
+            return {"date": rng.choice(dates), "specialization": rng.choice(specializations)}
+
+        def week(**who):
+            first = rng.randrange(max(len(dates) - 6, 1))
+            return {"start_date": dates[first], "end_date": dates[min(first + 6, len(dates) - 1)], **who}
+
+        free, taken = sample(rounds, True), sample(rounds, False)
+        reads = {
+            "check_availability_by_doctor": (toolkits.check_availability_by_doctor, [day_doctor() for _ in range(rounds)]),
+            "check_availability_by_specialization": (
+                toolkits.check_availability_by_specialization, [day_specialization() for _ in range(rounds)]),
+            "check_specific_slot[doctor,free]": (
+                toolkits.check_specific_slot, [{"date": d, "time": t, "doctor_name": doc} for d, t, doc in free]),
+            "check_specific_slot[doctor,taken]": (
+                toolkits.check_specific_slot, [{"date": d, "time": t, "doctor_name": doc} for d, t, doc in taken]),
+            "check_specific_slot[specialization,taken]": (
+                toolkits.check_specific_slot,
+                [{"date": d, "time": t, "specialization": roster[doc]} for d, t, doc in taken]),
+            "check_availability_range[doctor,week]": (
+                toolkits.check_availability_range, [week(doctor_name=rng.choice(names)) for _ in range(rounds)]),
+            "check_availability_range[specialization,mornings]": (
+                toolkits.check_availability_range,
+                [week(specialization=rng.choice(specializations), time_to="12:00") for _ in range(rounds)]),
+        }
+        for name, (tool, inputs) in reads.items():
+            results.append((name, "read", timed(tool, inputs, warmup=min(3, rounds))))
+
+        # booking paths: book, list, move and cancel `rounds` distinct appointments
+        booked = sample(rounds, True)
+        targets = []
+        for _, _, doctor in booked:
+            targets += sample(1, True, doctor=doctor, exclude=booked + targets)
+        # outside the generator's IDs, so these patients start with no appointments
+        patients = [str(PATIENT_IDS.stop + i) for i in range(rounds)]
+        moves = [
+            {"old_date": f"{d} {t}", "new_date": f"{new_d} {new_t}", "id_number": p, "doctor_name": doc}
+            for (d, t, doc), (new_d, new_t, _), p in zip(booked, targets, patients)
+        ]
+        writes = {
+            "set_appointment": (toolkits.set_appointment, [
+                {"date": f"{d} {t}", "id_number": p, "doctor_name": doc} for (d, t, doc), p in zip(booked, patients)]),
+            "list_my_appointments": (toolkits.list_my_appointments, [{"id_number": p} for p in patients]),
+            "reschedule_appointment": (toolkits.reschedule_appointment, moves),
+            "cancel_appointment": (toolkits.cancel_appointment, [
+                {"id_number": m["id_number"], "doctor_name": m["doctor_name"]} for m in moves]),
+        }
+        for name, (tool, inputs) in writes.items():
+            results.append((name, "booking", timed(tool, inputs)))
+        if any(store.appointments(int(p)) for p in patients):
+            raise RuntimeError("booking cases left appointments behind; the write paths did not run as timed")
+
+        return [
+            {"name": name, "group": group, "rows": generated, "target_rows": rows, "doctors": doctors,
+             "backend": backend, "stats": result}
+            for name, group, result in results
+        ]
+
+
+def commit_info() -> dict:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"id": sha, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--days", type=int, default=60, help="days of schedule; doctors scale with --sizes")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare medians against")
+    args = parser.parse_args()
+
+    benchmarks = []
+    for rows in args.sizes:
+        # a fresh interpreter per size: the store is a process-wide singleton
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            benchmarks += pool.submit(run_size, rows, args.backend, args.days, args.rounds, args.seed).result()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fh:
+            for b in json.load(fh)["benchmarks"]:
+                baseline[(b["name"], b["target_rows"], b["backend"])] = b["stats"]["median"]
+
+    print(f"{'tool':50s} {'rows':>9s} {'median':>10s} {'p95':>10s} {'ops/s':>9s}" + ("  vs baseline" if baseline else ""))
+    for b in benchmarks:
+        s = b["stats"]
+        line = f"{b['name']:50s} {b['rows']:9d} {s['median'] * 1e3:8.3f}ms {s['p95'] * 1e3:8.3f}ms {s['ops']:9.0f}"
+        before = baseline.get((b["name"], b["target_rows"], b["backend"]))
+        if before:
+            line += f"  x{s['median'] / before:.2f}"
+        print(line)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as fh:
+            json.dump({
+                "datetime": datetime.now().isoformat(timespec="seconds"),
+                "machine_info": {"python": platform.python_version(), "platform": platform.platform(),
+                                 "cpu_count": os.cpu_count()},
+                "commit_info": commit_info(),
+                "params": {"sizes": args.sizes, "backend": args.backend, "days": args.days,
+                           "rounds": args.rounds, "seed": args.seed},
+                "benchmarks": benchmarks,
+            }, fh, indent=2)
+        print(f"Wrote {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import re
+from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 
 class DateTimeModel (BaseModel):
@@ -28,3 +29,33 @@ class IdentificationNumberModel(BaseModel):
             raise ValueError("Identification number must be 7 or 8 digits long")
         return v
 
+
+class PendingAppointment(BaseModel):
+    """Appointment being negotiated in the conversation, filled in turn by turn."""
+    action: Optional[Literal["book", "cancel", "reschedule"]] = None
+    doctor: Optional[str] = None
+    specialization: Optional[str] = None
+    date: Optional[str] = Field(default=None, description="DD-MM-YYYY")
+    time: Optional[str] = Field(default=None, description="HH:MM (24-hour)")
+    seen: int = Field(default=0, description="Conversation messages already folded into the frame")
+
+    @field_validator("date")
+    def check_format_date(cls, v):
+        if v is not None:
+            DateModel(date=v)
+        return v
+
+    @field_validator("time")
+    def check_format_time(cls, v):
+        if v is not None and not re.match(r'^([01]\d|2[0-3]):[0-5]\d$', v):
+            raise ValueError("Time must be in the format HH:MM")
+        return v
+
+    def slot(self) -> Optional[str]:
+        """"DD-MM-YYYY HH:MM" once both date and time are known."""
+        if self.date is None or self.time is None:
+            return None
+        return DateTimeModel(date=f"{self.date} {self.time}").date
+
+    def ready_to_book(self) -> bool:
+        return self.action == "book" and self.doctor is not None and self.slot() is not None
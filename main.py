@@ -1,14 +1,27 @@
 #code for the API creation 
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from agent import DoctorAppointmentAgent
-from langchain_core.messages import HumanMessage
-from typing import List, Optional
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
+from typing import Annotated, List, Optional
+from utils.sessions import SessionSaver
+from utils.router import router_stats
+from utils.metrics import TURN_SECONDS, registry as metrics_registry
+from utils.log import configure_logging, get_logger, new_request_id, request_context
+from toolkit.schedule_store import BookingResult, get_schedule_store
+import json
 import os
+import time
 
 os.environ.pop("SSL_CERT_FILE", None)
 
+# LOG_LEVEL / LOG_FORMAT, see utils/log.py
+configure_logging()
+logger = get_logger(__name__)
+
 app = FastAPI()
 
 # Define Pydantic model to accept request body
@@ -20,30 +33,59 @@ class UserQuery(BaseModel):
     id_number: int
     message: str  # Current user message
     conversation_history: Optional[List[Message]] = []  # Optional: previous conversation
+    session_id: Optional[str] = None  # Optional: server-side session from POST /sessions
+
+class BulkBooking(BaseModel):
+    slot: str  # "DD-MM-YYYY HH:MM"
+    doctor_name: str
+    id_number: int
 
+class BulkBookingRequest(BaseModel):
+    bookings: List[BulkBooking]
+
+BULK_BOOKING_MAX = int(os.getenv("BULK_BOOKING_MAX", 10000))
+
+# graph and ReAct workers are compiled once per process and shared by all requests
 agent = DoctorAppointmentAgent()
+app_graph = agent.workflow()
 
-@app.post("/execute")
-def execute_agent(user_input: UserQuery):
-    app_graph = agent.workflow()
-    
-    # Build message list from conversation history
-    from langchain_core.messages import AIMessage
-    
+# session mode: the conversation lives in a checkpointer keyed by session_id,
+# so clients only send the new message
+session_saver = SessionSaver(
+    max_sessions=int(os.getenv("SESSION_MAX", 1000)),
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", 3600)),
+)
+session_graph = agent.build_graph(checkpointer=session_saver)
+
+
+def history_to_messages(history: Optional[List[Message]]) -> list:
     message_list = []
-    
-    # Add conversation history if provided
-    if user_input.conversation_history:
-        for msg in user_input.conversation_history:
-            if msg.role == "user":
-                message_list.append(HumanMessage(content=msg.content))
-            elif msg.role == "assistant":
-                message_list.append(AIMessage(content=msg.content))
-    
-    # Add current user message
-    message_list.append(HumanMessage(content=user_input.message))
+    for msg in history or []:
+        if msg.role == "user":
+            message_list.append(HumanMessage(content=msg.content))
+        elif msg.role == "assistant":
+            message_list.append(AIMessage(content=msg.content))
+    return message_list
 
-    query_data = {
+
+def messages_to_history(messages: list) -> list:
+    conversation_history = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            conversation_history.append({"role": "user", "content": msg.content})
+        elif isinstance(msg, AIMessage):
+            conversation_history.append({"role": "assistant", "content": msg.content})
+        elif isinstance(msg, dict):
+            if msg.get('type') == 'human':
+                conversation_history.append({"role": "user", "content": msg.get('content', '')})
+            elif msg.get('type') == 'ai':
+                conversation_history.append({"role": "assistant", "content": msg.get('content', '')})
+    return conversation_history
+
+
+def build_query_data(user_input: UserQuery, message_list: list) -> dict:
+    # per-turn bookkeeping is reset every turn, also when resuming a session
+    return {
         "messages": message_list,
         "id_number": user_input.id_number,
         "next": "",
@@ -53,13 +95,9 @@ def execute_agent(user_input: UserQuery):
         "last_node": "",  # track last node visited
     }
 
-    # recursion limit prevents infinite loops (increased for complex conversations)
-    response = app_graph.invoke(query_data, config={"recursion_limit": 30})
 
-    # Extract just the text content from the last AI message
-    from langchain_core.messages import AIMessage
-    
-    messages = response["messages"]
+def last_ai_message_content(messages: list):
+    """Extract just the text content from the last AI message."""
     last_ai_message = None
     
     # Find the last AI message (skip human messages)
@@ -89,18 +127,92 @@ def execute_agent(user_input: UserQuery):
         else:
             last_ai_message = str(last_msg)
     
+    return last_ai_message
+
+
+@app.post("/sessions")
+async def create_session():
+    return {"session_id": session_saver.create(), "status": "success"}
+
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    if not session_saver.close(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    return {"session_id": session_id, "status": "closed"}
+
+
+@app.get("/stats")
+async def stats():
+    """Supervisor routing and availability-cache counters for this worker process."""
+    return {"router": router_stats.snapshot(), "response_cache": agent.response_cache.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text format: graph node, tool, LLM (with tokens) and schedule
+    store timings, turn latency and loop-guard exits, for this worker process.
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/appointments/bulk")
+async def bulk_book(request: BulkBookingRequest):
+    """
+    Book many appointments at once (e.g. the front desk's phone bookings).
+    Items that cannot be booked are reported and skipped; the others are
+    applied together in one store transaction. Results are in request order.
+    """
+    if len(request.bookings) > BULK_BOOKING_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_BOOKING_MAX} bookings per request.")
+    items = [(b.slot.strip(), b.doctor_name.strip().lower(), b.id_number) for b in request.bookings]
+    # the store write is blocking file/database I/O
+    results = await run_in_threadpool(get_schedule_store().book_many, items)
+    return {
+        "results": [
+            {"slot": slot, "doctor_name": doctor_name, "id_number": id_number, "result": result.value}
+            for (slot, doctor_name, id_number), result in zip(items, results)
+        ],
+        "booked": sum(result is BookingResult.BOOKED for result in results),
+        "status": "success",
+    }
+
+
+@app.post("/execute")
+async def execute_agent(user_input: UserQuery, x_request_id: Annotated[Optional[str], Header()] = None):
+    """One patient turn. Its log records carry X-Request-ID (or a fresh ID), which is also returned."""
+    with request_context(x_request_id) as request_id:
+        start = time.perf_counter()
+        if user_input.session_id:
+            result = await execute_session_turn(user_input)
+        else:
+            result = await execute_stateless_turn(user_input)
+        logger.info("turn for patient %s answered in %.3f s", user_input.id_number, time.perf_counter() - start,
+                    extra={"session_id": user_input.session_id})
+    return {**result, "request_id": request_id}
+
+
+async def execute_stateless_turn(user_input: UserQuery):
+
+    # Build message list from conversation history
+    message_list = history_to_messages(user_input.conversation_history)
+    
+    # Add current user message
+    message_list.append(HumanMessage(content=user_input.message))
+
+    query_data = build_query_data(user_input, message_list)
+
+    # recursion limit prevents infinite loops (increased for complex conversations)
+    # LLM round-trips are awaited, so the event loop keeps serving other conversations
+    with TURN_SECONDS.time(mode="stateless"):
+        response = await app_graph.ainvoke(query_data, config={"recursion_limit": 30})
+
+    messages = response["messages"]
+    last_ai_message = last_ai_message_content(messages)
+    
     # Return response with conversation history for next turn
-    conversation_history = []
-    for msg in messages:
-        if isinstance(msg, HumanMessage):
-            conversation_history.append({"role": "user", "content": msg.content})
-        elif isinstance(msg, AIMessage):
-            conversation_history.append({"role": "assistant", "content": msg.content})
-        elif isinstance(msg, dict):
-            if msg.get('type') == 'human':
-                conversation_history.append({"role": "user", "content": msg.get('content', '')})
-            elif msg.get('type') == 'ai':
-                conversation_history.append({"role": "assistant", "content": msg.get('content', '')})
+    conversation_history = messages_to_history(messages)
     
     # Return simple text response with conversation history
     return {
@@ -108,3 +220,108 @@ def execute_agent(user_input: UserQuery):
         "conversation_history": conversation_history,
         "status": "success"
     }
+
+
+def session_turn_input(user_input: UserQuery):
+    """(query_data, config) for one turn of a server-side session; 404 if it is unknown."""
+    if not session_saver.exists(user_input.session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session. Create a new one with POST /sessions.")
+
+    config = {"recursion_limit": 30, "configurable": {"thread_id": user_input.session_id}}
+    message_list = [HumanMessage(content=user_input.message)]
+    # a client moving over from stateless mode can seed a fresh session with its history
+    if user_input.conversation_history and session_saver.get_tuple(config) is None:
+        message_list = history_to_messages(user_input.conversation_history) + message_list
+    return build_query_data(user_input, message_list), config
+
+
+def session_reply(messages: list):
+    # the checkpointed history holds earlier turns too; only look past this turn's user message
+    turn_start = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=0)
+    return last_ai_message_content(messages[turn_start + 1:])
+
+
+async def execute_session_turn(user_input: UserQuery):
+    query_data, config = session_turn_input(user_input)
+    with TURN_SECONDS.time(mode="session"):
+        response = await session_graph.ainvoke(query_data, config=config)
+    last_ai_message = session_reply(response["messages"])
+
+    # only the new reply goes back; the history stays on the server
+    return {
+        "response": last_ai_message if last_ai_message else "No response generated.",
+        "session_id": user_input.session_id,
+        "status": "success"
+    }
+
+
+# -----------------------------------------
+# STREAMING (server-sent events)
+# -----------------------------------------
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/execute/stream")
+async def execute_agent_stream(user_input: UserQuery, x_request_id: Annotated[Optional[str], Header()] = None):
+    """
+    Same request body as POST /execute, answered as server-sent events:
+      event: node   {"node": ...}         a graph node finished
+      event: token  {"content": ...}      reply tokens as the worker LLM produces them
+      event: done   {"response": ..., ...} final reply (same fields as /execute)
+      event: error  {"detail": ...}
+    """
+    request_id = x_request_id or new_request_id()
+    if user_input.session_id:
+        query_data, config = session_turn_input(user_input)
+        graph = session_graph
+    else:
+        message_list = history_to_messages(user_input.conversation_history)
+        message_list.append(HumanMessage(content=user_input.message))
+        query_data, config = build_query_data(user_input, message_list), {"recursion_limit": 30}
+        graph = app_graph
+
+    return StreamingResponse(
+        stream_turn(graph, query_data, config, user_input.session_id, request_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_turn(graph, query_data: dict, config: dict, session_id: Optional[str], request_id: str):
+    final_messages = []
+    start = time.perf_counter()
+    # the response body is iterated after the endpoint returned: set the request's log context here
+    with request_context(request_id):
+        try:
+            async for mode, chunk in graph.astream(query_data, config=config, stream_mode=["updates", "messages", "values"]):
+                if mode == "messages":
+                    message, metadata = chunk
+                    # checkpoint_ns is "<top-level node>:<task id>|..." also inside the ReAct sub-agents;
+                    # the supervisor only emits routing decisions, never reply text
+                    top_node = metadata.get("langgraph_checkpoint_ns", "").split(":")[0]
+                    if top_node != "supervisor" and isinstance(message, AIMessageChunk) and message.content:
+                        yield sse("token", {"content": message.content})
+                elif mode == "updates":
+                    for node in chunk:
+                        yield sse("node", {"node": node})
+                elif mode == "values":
+                    final_messages = chunk.get("messages", [])
+        except Exception as e:
+            logger.exception("streamed turn failed")
+            yield sse("error", {"detail": str(e), "request_id": request_id})
+            return
+        finally:
+            TURN_SECONDS.observe(time.perf_counter() - start, mode="stream")
+        logger.info("streamed turn answered in %.3f s", time.perf_counter() - start, extra={"session_id": session_id})
+
+    if session_id:
+        last_ai_message = session_reply(final_messages)
+        done = {"session_id": session_id}
+    else:
+        last_ai_message = last_ai_message_content(final_messages)
+        done = {"conversation_history": messages_to_history(final_messages)}
+    done["response"] = last_ai_message if last_ai_message else "No response generated."
+    done["status"] = "success"
+    done["request_id"] = request_id
+    yield sse("done", done)
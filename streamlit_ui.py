@@ -1,7 +1,10 @@
+import json
 import streamlit as st
 import requests
 
-API_URL = "http://127.0.0.1:8002/execute" 
+API_URL = "http://127.0.0.1:8002" 
+STREAM_URL = f"{API_URL}/execute/stream"
+SESSIONS_URL = f"{API_URL}/sessions"
 
 st.title("🩺 Doctor Appointment System")
 
@@ -10,6 +13,66 @@ if "conversation" not in st.session_state:
     st.session_state.conversation = []
 if "user_id" not in st.session_state:
     st.session_state.user_id = ""
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
+
+
+def new_session():
+    """Open a server-side session; the API keeps the history, we only send new messages."""
+    response = requests.post(SESSIONS_URL, verify=False)
+    response.raise_for_status()
+    return response.json()["session_id"]
+
+
+def close_session():
+    """Drop the server-side session, if any; an expired one is already gone."""
+    if st.session_state.session_id:
+        try:
+            requests.delete(f"{SESSIONS_URL}/{st.session_state.session_id}", verify=False)
+        except requests.RequestException:
+            pass
+    st.session_state.session_id = None
+
+
+def send_message(user_query, history):
+    """Open the SSE stream for one turn."""
+    payload = {
+        'message': user_query,
+        'id_number': int(st.session_state.user_id),
+        'session_id': st.session_state.session_id,
+    }
+    response = requests.post(STREAM_URL, json=payload, stream=True, verify=False)
+    if response.status_code == 404:
+        # session expired on the server: start a new one seeded with our copy of the history
+        st.session_state.session_id = new_session()
+        payload['session_id'] = st.session_state.session_id
+        payload['conversation_history'] = history
+        response = requests.post(STREAM_URL, json=payload, stream=True, verify=False)
+    return response
+
+
+def stream_reply(response, result):
+    """
+    Yield reply tokens from the server-sent events as they arrive.
+    The final reply from the `done` event is stored in result["response"].
+    """
+    event = None
+    streamed = False
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):])
+            if event == "token":
+                streamed = True
+                yield data["content"]
+            elif event == "done":
+                result["response"] = data["response"]
+            elif event == "error":
+                raise RuntimeError(data["detail"])
+    # nothing was streamed (e.g. the turn ended without a worker LLM call)
+    if not streamed and result.get("response"):
+        yield result["response"]
 
 # User ID input (only show if not set)
 if not st.session_state.user_id:
@@ -25,6 +88,7 @@ else:
         if st.button("Change ID"):
             st.session_state.user_id = ""
             st.session_state.conversation = []
+            close_session()
             st.rerun()
 
 # Display conversation history
@@ -45,38 +109,31 @@ if st.session_state.user_id:
     if user_query:
         # Add user message to conversation
         st.session_state.conversation.append({"role": "user", "content": user_query})
+        with st.chat_message("user"):
+            st.write(user_query)
         
-        # Prepare request with conversation history
+        # Local copy of the history, only sent if the server-side session has expired
         conversation_history = [
             {"role": msg["role"], "content": msg["content"]} 
             for msg in st.session_state.conversation[:-1]  # Exclude current message
         ]
         
         try:
-            with st.spinner("Processing..."):
-                response = requests.post(
-                    API_URL, 
-                    json={
-                        'message': user_query,
-                        'id_number': int(st.session_state.user_id),
-                        'conversation_history': conversation_history
-                    },
-                    verify=False
-                )
+            if not st.session_state.session_id:
+                st.session_state.session_id = new_session()
+            response = send_message(user_query, conversation_history)
                 
             if response.status_code == 200:
-                result = response.json()
+                result = {}
+                # Render tokens as they arrive instead of waiting for the whole turn
+                with st.chat_message("assistant"):
+                    st.write_stream(stream_reply(response, result))
                 
                 # Add assistant response to conversation
                 if "response" in result:
                     assistant_response = result["response"]
                     st.session_state.conversation.append({"role": "assistant", "content": assistant_response})
                     
-                    # Update conversation history from API if provided
-                    if "conversation_history" in result:
-                        # Sync with API's version (in case it's different)
-                        pass
-                    
                     st.rerun()  # Refresh to show new message
                 else:
                     st.error("No response received from API")
@@ -88,4 +145,5 @@ if st.session_state.user_id:
     # Clear conversation button
     if st.button("Clear Conversation"):
         st.session_state.conversation = []
+        close_session()
         st.rerun()
\ No newline at end of file
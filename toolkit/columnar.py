@@ -0,0 +1,194 @@
+from array import array
+from datetime import date as Date, datetime, time as Time, timedelta
+
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_DAY = 24 * 60
+NO_PATIENT = -1
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _code_dtype(n: int):
+    """Smallest signed integer type that holds codes 0..n-1."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class ColumnarSchedule:
+    """
+    Compact in-memory schedule, one entry per row of the normalised DataFrame
+    (see normalise_schedule()), in the same order:
+
+    - doctor / specialization: integer codes into doctor_names / specialization_names
+    - minutes: int32 minutes since `epoch`, midnight of the first day
+    - patient: int64 patient IDs, NO_PATIENT when free
+    - availability: one bitset per (doctor, day), a bit per `granularity`
+      minutes of the day (30-minute slots: 48 bits, one uint64 word), so
+      the free slots between 9 and 12 are an AND with a mask (free_minutes)
+
+    Rows are found by (doctor, minute) with a binary search over a sorted
+    key array. by_patient maps a patient to the int32 rows of their
+    appointments (array('i'), no Python object per row).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        doctor_codes, doctor_names = pd.factorize(df['doctor_name'])
+        specialization_codes, specialization_names = pd.factorize(df['specialization'])
+        self.doctor_names = list(doctor_names)
+        self.specialization_names = list(specialization_names)
+        self._doctor_code = {name: code for code, name in enumerate(self.doctor_names)}
+        self._specialization_code = {name: code for code, name in enumerate(self.specialization_names)}
+        self.doctor = doctor_codes.astype(_code_dtype(len(self.doctor_names)))
+        self.specialization = specialization_codes.astype(_code_dtype(len(self.specialization_names)))
+
+        # a doctor has one specialization; the last row wins, as in BaseScheduleStore.doctors()
+        self.doctor_specialization = np.zeros(len(self.doctor_names), dtype=self.specialization.dtype)
+        self.doctor_specialization[self.doctor] = self.specialization
+        self._specialization_doctors = [
+            np.flatnonzero(self.doctor_specialization == code) for code in range(len(self.specialization_names))
+        ]
+
+        absolute = df['slot'].to_numpy().astype('datetime64[m]').astype(np.int64)
+        self.epoch = int(absolute.min() // MINUTES_PER_DAY * MINUTES_PER_DAY) if len(df) else 0
+        self.minutes = (absolute - self.epoch).astype(np.int32)
+        self.patient = df['patient_to_attend'].to_numpy(dtype=np.int64, na_value=NO_PATIENT)
+
+        minute_of_day = self.minutes % MINUTES_PER_DAY
+        self.granularity = int(np.gcd.reduce(np.append(minute_of_day, MINUTES_PER_DAY)))
+        self.bits_per_day = MINUTES_PER_DAY // self.granularity
+        self.words = -(-self.bits_per_day // 64)
+        self.days = int(self.minutes.max()) // MINUTES_PER_DAY + 1 if len(df) else 0
+        self._free = np.zeros((len(self.doctor_names), self.days, self.words), dtype='<u8')
+        free = df['is_available'].to_numpy(dtype=bool)
+        doctor, day, word, bit = self._locate(np.flatnonzero(free))
+        np.bitwise_or.at(self._free, (doctor, day, word), np.left_shift(np.uint64(1), bit))
+
+        # (doctor, minute) -> row
+        keys = (self.doctor.astype(np.int64) << 32) | self.minutes
+        self._order = np.argsort(keys, kind='stable').astype(np.int32)
+        self._keys = keys[self._order]
+
+        booked = np.flatnonzero(self.patient != NO_PATIENT)
+        booked = booked[np.argsort(self.patient[booked], kind='stable')].astype(np.int32)
+        patients, starts = np.unique(self.patient[booked], return_index=True)
+        self.by_patient = {}
+        for patient, rows in zip(patients.tolist(), np.split(booked, starts[1:])):
+            self.by_patient[patient] = array('i', rows.tobytes())
+
+        # "HH:MM" of every bit of a day
+        self._labels = [
+            f"{b * self.granularity // 60:02d}:{b * self.granularity % 60:02d}" for b in range(self.bits_per_day)
+        ]
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def nbytes(self) -> int:
+        """Bytes held by the arrays (the per-row cost; dicts and names are extra)."""
+        arrays = (self.doctor, self.specialization, self.minutes, self.patient, self._free, self._order, self._keys)
+        return sum(a.nbytes for a in arrays)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The rows as a DataFrame: slot, specialization, doctor_name, is_available, patient_to_attend."""
+        rows = np.arange(len(self))
+        return pd.DataFrame({
+            'slot': (self.minutes.astype(np.int64) + self.epoch).astype('datetime64[m]').astype('datetime64[ns]'),
+            'specialization': pd.Categorical.from_codes(self.specialization, self.specialization_names),
+            'doctor_name': pd.Categorical.from_codes(self.doctor, self.doctor_names),
+            'is_available': self.is_free(rows),
+            'patient_to_attend': pd.array(np.where(self.patient == NO_PATIENT, None, self.patient), dtype="Int64"),
+        })
+
+    # -----------------------------------------
+    # ROWS
+    # -----------------------------------------
+    def _locate(self, rows):
+        """(doctor, day, word, bit) of rows in the bitsets."""
+        minutes = self.minutes[rows]
+        bit = (minutes % MINUTES_PER_DAY) // self.granularity
+        return self.doctor[rows], minutes // MINUTES_PER_DAY, bit // 64, (bit % 64).astype(np.uint64)
+
+    def day(self, date: Date) -> int:
+        """Day number of date (may be outside 0..days-1)."""
+        return (datetime.combine(date, Time()) - _EPOCH).days - self.epoch // MINUTES_PER_DAY
+
+    def row(self, date: Date, time: Time, doctor_name: str):
+        """Row of the doctor's slot at date/time, or None."""
+        code = self._doctor_code.get(doctor_name)
+        if code is None or date is None:
+            return None
+        minute = self.day(date) * MINUTES_PER_DAY + time.hour * 60 + time.minute
+        key = (code << 32) | (minute & 0xFFFFFFFF)
+        i = int(np.searchsorted(self._keys, key))
+        if i == len(self._keys) or self._keys[i] != key or minute < 0:
+            return None
+        return int(self._order[i])
+
+    def is_free(self, rows):
+        doctor, day, word, bit = self._locate(rows)
+        return (np.right_shift(self._free[doctor, day, word], bit) & np.uint64(1)).astype(bool)
+
+    def patient_of(self, row: int):
+        patient = int(self.patient[row])
+        return None if patient == NO_PATIENT else patient
+
+    def doctor_of(self, row: int) -> str:
+        return self.doctor_names[self.doctor[row]]
+
+    def slot_of(self, row: int) -> datetime:
+        return _EPOCH + timedelta(minutes=self.epoch + int(self.minutes[row]))
+
+    def set(self, row: int, is_available: bool, patient):
+        previous = self.patient_of(row)
+        # first, so an ID that doesn't fit int64 fails before any index changes
+        self.patient[row] = NO_PATIENT if patient is None else patient
+        if previous is not None:
+            self.by_patient[previous].remove(row)
+            if not self.by_patient[previous]:
+                del self.by_patient[previous]
+        if patient is not None:
+            self.by_patient.setdefault(patient, array('i')).append(row)
+        doctor, day, word, bit = self._locate(row)
+        if is_available:
+            self._free[doctor, day, word] |= np.left_shift(np.uint64(1), bit)
+        else:
+            self._free[doctor, day, word] &= ~np.left_shift(np.uint64(1), bit)
+
+    # -----------------------------------------
+    # BITSET QUERIES
+    # -----------------------------------------
+    def doctor_code(self, doctor_name: str):
+        return self._doctor_code.get(doctor_name)
+
+    def specialization_doctors(self, specialization: str) -> list:
+        """Doctor codes of a specialization, in first-seen order."""
+        code = self._specialization_code.get(specialization)
+        return [] if code is None else self._specialization_doctors[code].tolist()
+
+    def time_mask(self, first_minute: int = 0, end_minute: int = MINUTES_PER_DAY) -> np.ndarray:
+        """uint64 words with the bits of minutes-of-day in [first_minute, end_minute) set."""
+        bits = np.zeros(self.words * 64, dtype=bool)
+        bits[-(-first_minute // self.granularity):-(-end_minute // self.granularity)] = True
+        return np.packbits(bits, bitorder='little').view('<u8')
+
+    def free_minutes(self, doctor: int, first_day: int, end_day: int, mask: np.ndarray = None) -> np.ndarray:
+        """Free minutes (since epoch, ascending) of a doctor on days [first_day, end_day), optionally masked."""
+        first_day, end_day = max(first_day, 0), min(end_day, self.days)
+        if end_day <= first_day:
+            return np.empty(0, dtype=np.int64)
+        block = self._free[doctor, first_day:end_day]
+        if mask is not None:
+            block = block & mask
+        bits = np.unpackbits(block.view(np.uint8), axis=1, bitorder='little')
+        day, bit = np.nonzero(bits)
+        return (first_day + day.astype(np.int64)) * MINUTES_PER_DAY + bit * self.granularity
+
+    def time_label(self, minute: int) -> str:
+        """"HH:MM" of a minute since epoch."""
+        return self._labels[(minute % MINUTES_PER_DAY) // self.granularity]
+
+    def slot_at(self, minute: int) -> datetime:
+        return _EPOCH + timedelta(minutes=self.epoch + int(minute))
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from typing import Literal, NamedTuple, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field, create_model
+
+from toolkit.schedule_store import BaseScheduleStore, get_schedule_store
+
+# seconds between checks of the store for doctors added or removed by other processes (0 = never)
+DEFAULT_REFRESH_SECONDS = 300
+# tool arguments narrowed to the roster's values
+ROSTER_FIELDS = ("doctor_name", "specialization")
+
+
+class Roster(NamedTuple):
+    doctors: dict  # {doctor_name: specialization}
+    specializations: tuple  # sorted
+    version: int  # bumped whenever doctors change
+
+
+class ToolRegistry:
+    """
+    Doctors and specializations as the schedule store has them, and the tools
+    built from them. The toolkit's tools take plain strings; tools() returns
+    copies whose doctor_name / specialization arguments are Literals of the
+    current roster, so the LLM sees the valid values in the tool schema.
+    Tools and their JSON schemas are built once per roster version.
+
+    The roster is re-read on the next roster() after the store reports a
+    booking for a doctor it doesn't know, on refresh(), and every
+    `refresh_seconds` otherwise. The narrowed tools still run the toolkit
+    functions, which read and book through get_schedule_store(), so a
+    registry only makes sense on that store (the default).
+    """
+
+    def __init__(self, store: BaseScheduleStore = None, refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
+        self.store = store or get_schedule_store()
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._roster = Roster({}, (), 0)
+        self._checked_at = 0.0
+        self._stale = False  # a change named a doctor outside the roster
+        self._tools = {}  # tool name -> roster-typed tool, for the current version
+        self._schemas = {}  # tool name -> OpenAI-format schema, for the current version
+        self._listeners = []
+        self.refresh()
+        self.store.add_change_listener(self._on_change)
+
+    def roster(self) -> Roster:
+        if self._stale or (self.refresh_seconds and time.monotonic() - self._checked_at > self.refresh_seconds):
+            self.refresh()
+        return self._roster
+
+    def refresh(self) -> bool:
+        """Re-read the doctors from the store. Returns True if the roster changed."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._stale = False
+            doctors = self.store.doctors()
+            if doctors == self._roster.doctors:
+                return False
+            self._roster = Roster(doctors, tuple(sorted(set(doctors.values()))), self._roster.version + 1)
+            self._tools, self._schemas = {}, {}
+        for callback in self._listeners:
+            callback(self._roster)
+        return True
+
+    def add_roster_listener(self, callback):
+        """Call callback(roster) whenever refresh() finds a changed roster."""
+        self._listeners.append(callback)
+
+    def _on_change(self, date: str, doctor_name: str):
+        # listeners may run while the store is busy: only mark the roster, roster() re-reads it
+        if doctor_name not in self._roster.doctors:
+            self._stale = True
+
+    def tools(self, base_tools: list) -> list:
+        """Roster-typed copies of the given toolkit tools."""
+        self.roster()
+        with self._lock:
+            for base in base_tools:
+                if base.name not in self._tools:
+                    self._tools[base.name] = self._narrow(base)
+            return [self._tools[base.name] for base in base_tools]
+
+    def schemas(self, base_tools: list) -> list:
+        """OpenAI-format schemas of tools(base_tools), for llm.bind_tools()."""
+        tools = self.tools(base_tools)
+        with self._lock:
+            for t in tools:
+                if t.name not in self._schemas:
+                    self._schemas[t.name] = convert_to_openai_tool(t)
+            return [self._schemas[t.name] for t in tools]
+
+    def _narrow(self, base: BaseTool) -> BaseTool:
+        choices = {"doctor_name": tuple(sorted(self._roster.doctors)), "specialization": self._roster.specializations}
+        fields = {}
+        for name, info in base.args_schema.model_fields.items():
+            if name not in ROSTER_FIELDS or not choices[name]:
+                continue
+            annotation = Literal[choices[name]]
+            if not info.is_required():
+                annotation = Optional[annotation]
+            fields[name] = (annotation, Field(default=info.default, description=info.description))
+        if not fields:
+            return base
+        schema = create_model(base.args_schema.__name__, __base__=base.args_schema, **fields)
+        return StructuredTool.from_function(
+            func=base.func, name=base.name, description=base.description, args_schema=schema,
+        )
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_registry() -> ToolRegistry:
+    """The registry of the shared store (get_schedule_store()), created on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ToolRegistry(
+                    refresh_seconds=float(os.getenv("ROSTER_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS)),
+                )
+    return _registry
@@ -0,0 +1,834 @@
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from enum import Enum
+import numpy as np
+import pandas as pd
+from pydantic import ValidationError
+from data_models.models import IdentificationNumberModel
+from toolkit.columnar import ColumnarSchedule
+from utils.log import get_logger
+from utils.metrics import STORE_SECONDS, timed_method
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = get_logger(__name__)
+
+DEFAULT_CSV_PATH = "data/doctor_availability.csv"
+DEFAULT_DB_PATH = "data/doctor_availability.db"
+DEFAULT_COMPACT_EVERY = 500
+CSV_COLUMNS = ['date_slot', 'specialization', 'doctor_name', 'is_available', 'patient_to_attend']
+SLOT_FORMAT = "%d-%m-%Y %H:%M"
+PATIENT_ID_MAX = np.iinfo(np.int64).max
+
+# store methods timed into schedule_store_operation_seconds (utils/metrics.py)
+READ_OPERATIONS = (
+    "doctors", "available_times", "available_by_specialization", "is_available", "available_doctors_at",
+    "nearest_available", "available_in_range", "appointments",
+)
+WRITE_OPERATIONS = ("book", "cancel", "book_many", "reschedule")
+
+# "DD-MM-YYYY H.MM" / "DD-MM-YYYY H:MM" as found in older exports
+_LEGACY_SLOT = r'^(\d{2}-\d{2}-\d{4})\s+(\d{1,2})[.:](\d{2})$'
+
+
+def normalise_schedule(df: pd.DataFrame):
+    """
+    Ingest stage for raw schedule rows.
+    - rewrites every date_slot to canonical "DD-MM-YYYY HH:MM"
+    - adds a typed `slot` (datetime64) column plus `date` / `time`
+    - lower-cases doctor_name / specialization and coerces is_available to bool
+    - stores patient_to_attend as nullable integers ("1000082.0" -> 1000082)
+    Returns (clean_df, malformed_df, rewritten_count). Malformed rows keep
+    their original index so they can be reported by line number.
+    """
+    raw = df['date_slot'].astype(str).str.strip()
+    canonical = raw.str.replace(
+        _LEGACY_SLOT, lambda m: f"{m[1]} {int(m[2]):02d}:{m[3]}", regex=True
+    )
+    slot = pd.to_datetime(canonical, format=SLOT_FORMAT, errors='coerce')
+
+    bad = slot.isna() | df['doctor_name'].isna() | df['specialization'].isna()
+    rewritten = int(((canonical != df['date_slot']) & ~bad).sum())
+
+    clean = df[~bad].copy()
+    clean['date_slot'] = canonical[~bad]
+    clean['slot'] = slot[~bad]
+    clean['date'] = clean['slot'].dt.date
+    clean['time'] = clean['slot'].dt.time
+    clean['doctor_name'] = clean['doctor_name'].str.strip().str.lower()
+    clean['specialization'] = clean['specialization'].str.strip().str.lower()
+    clean['is_available'] = clean['is_available'].astype(str).str.strip().str.lower() == 'true'
+    clean['patient_to_attend'] = pd.array(
+        [patient_id(p) for p in clean['patient_to_attend']], dtype="Int64"
+    )
+    return clean.reset_index(drop=True), df[bad], rewritten
+
+
+def patient_id(value):
+    """
+    A patient ID as int (1000082, "1000082" and "1000082.0" are all 1000082),
+    or None. IDs are positive and fit the int64 patient column, which keeps
+    NO_PATIENT (-1) for free slots.
+    """
+    text = str(value).strip()
+    try:
+        number = int(text)
+    except ValueError:
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        if number != number or not number.is_integer():
+            return None
+        number = int(number)
+    return number if 0 < number <= PATIENT_ID_MAX else None
+
+
+def _parse_date(date_str: str):
+    """"DD-MM-YYYY" -> datetime.date, or None if it doesn't parse."""
+    try:
+        return datetime.strptime(date_str.strip(), "%d-%m-%Y").date()
+    except (ValueError, AttributeError):
+        return None
+
+
+def _window_bounds(date, day_window: int):
+    """(first, last) datetime of the days within day_window of date, last exclusive."""
+    start = datetime.combine(date, datetime.min.time()) - timedelta(days=day_window)
+    return start, start + timedelta(days=2 * day_window + 1)
+
+
+def _time_window(time_from: str = None, time_to: str = None):
+    """("HH:MM" | None, "HH:MM" | None) -> (first, end) minute of the day, end exclusive."""
+    def minute(t, default):
+        if not t:
+            return default
+        parsed = datetime.strptime(t.strip(), "%H:%M")
+        return parsed.hour * 60 + parsed.minute
+    return minute(time_from, 0), minute(time_to, 24 * 60)
+
+
+def _parse_slot(slot: str):
+    """"DD-MM-YYYY HH:MM" -> (datetime.date, datetime.time), or (None, None)."""
+    try:
+        dt = datetime.strptime(slot.strip(), SLOT_FORMAT)
+    except (ValueError, AttributeError):
+        return None, None
+    return dt.date(), dt.time()
+
+
+class RescheduleResult(str, Enum):
+    """Outcome of BaseScheduleStore.reschedule(); only RESCHEDULED changes anything."""
+    RESCHEDULED = "rescheduled"
+    NOT_BOOKED = "not_booked"  # the patient holds no appointment at the old slot
+    UNKNOWN_SLOT = "unknown_slot"  # the doctor has no new slot at that time
+    SLOT_TAKEN = "slot_taken"  # the new slot exists but is not free
+    SAME_SLOT = "same_slot"  # old and new slot are the same
+
+
+class BookingResult(str, Enum):
+    """Per-item outcome of BaseScheduleStore.book_many(); only BOOKED changes anything."""
+    BOOKED = "booked"
+    INVALID = "invalid"  # malformed slot or patient ID
+    UNKNOWN_SLOT = "unknown_slot"  # the doctor has no slot at that time
+    SLOT_TAKEN = "slot_taken"  # the slot is not free
+    DUPLICATE = "duplicate"  # an earlier item of the same batch already took the slot
+
+
+def _validate_bookings(bookings) -> tuple:
+    """
+    Parse [(slot, doctor_name, id_number)] once for book_many():
+    returns [(slot_key, patient)] and the per-item results so far (INVALID or None).
+    Patient IDs must pass IdentificationNumberModel, like the agent's.
+    """
+    parsed, results = [], []
+    for slot, doctor_name, id_number in bookings:
+        date, time = _parse_slot(slot)
+        patient = patient_id(id_number)
+        if patient is not None:
+            try:
+                IdentificationNumberModel(id=str(patient))
+            except ValidationError:
+                patient = None
+        parsed.append(((date, time, doctor_name), patient))
+        results.append(BookingResult.INVALID if date is None or patient is None else None)
+    return parsed, results
+
+
+class BaseScheduleStore(ABC):
+    """
+    Storage-agnostic schedule API the toolkit is written against.
+    Dates are "DD-MM-YYYY", slots "DD-MM-YYYY HH:MM", times "HH:MM".
+    Successful writes are announced to change listeners, see add_change_listener().
+    Every backend's reads and writes are timed per operation (see __init_subclass__).
+    """
+
+    backend = "base"  # label of the store's metrics
+
+    def __init__(self):
+        self._listeners = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for kind, operations in (("read", READ_OPERATIONS), ("write", WRITE_OPERATIONS)):
+            for operation in operations:
+                if operation in cls.__dict__:
+                    setattr(cls, operation, timed_method(
+                        STORE_SECONDS, cls.__dict__[operation], backend=cls.backend, operation=operation, kind=kind,
+                    ))
+
+    @abstractmethod
+    def doctors(self) -> dict:
+        """{doctor_name: specialization} for every doctor in the schedule."""
+
+    @abstractmethod
+    def available_times(self, date: str, doctor_name: str) -> list:
+        """Free "HH:MM" slots for a doctor on a date, in time order."""
+
+    @abstractmethod
+    def available_by_specialization(self, date: str, specialization: str) -> dict:
+        """{doctor_name: ["HH:MM", ...]} of free slots for a specialization on a date."""
+
+    @abstractmethod
+    def is_available(self, slot: str, doctor_name: str) -> bool:
+        """Whether the doctor's slot exists and is free."""
+
+    @abstractmethod
+    def available_doctors_at(self, slot: str, specialization: str) -> list:
+        """Doctors of a specialization that are free at a slot."""
+
+    @abstractmethod
+    def nearest_available(self, slot: str, doctor_name: str = None, specialization: str = None,
+                          k: int = 5, day_window: int = 0) -> list:
+        """
+        The k free slots closest in time to `slot`, as [("DD-MM-YYYY HH:MM", doctor_name)],
+        nearest first (earlier first on ties). Searches one doctor, or every doctor of a
+        specialization, from `day_window` days before the slot's date to as many after.
+        """
+
+    @abstractmethod
+    def available_in_range(self, start_date: str, end_date: str, doctor_name: str = None,
+                           specialization: str = None, time_from: str = None, time_to: str = None) -> dict:
+        """
+        Free slots of one doctor, or of every doctor of a specialization, from
+        start_date to end_date inclusive, optionally only starting in
+        [time_from, time_to): {"DD-MM-YYYY": {doctor_name: ["HH:MM", ...]}}, days in order.
+        """
+
+    @abstractmethod
+    def appointments(self, id_number) -> list:
+        """The patient's booked slots, [("DD-MM-YYYY HH:MM", doctor_name)] in time order."""
+
+    @abstractmethod
+    def book(self, slot: str, doctor_name: str, id_number) -> bool:
+        """Atomically take a free slot. Returns False if it is not free."""
+
+    @abstractmethod
+    def cancel(self, slot: str, doctor_name: str, id_number) -> bool:
+        """Atomically free a slot held by the patient. Returns False if there is no such appointment."""
+
+    @abstractmethod
+    def book_many(self, bookings) -> list:
+        """
+        Book [(slot, doctor_name, id_number)] in one transaction and one write.
+        Items are checked in order against the store and against each other;
+        the ones that fail are skipped, the rest are applied together.
+        Returns a BookingResult per item, in input order.
+        """
+
+    @abstractmethod
+    def reschedule(self, old_slot: str, new_slot: str, doctor_name: str, id_number) -> RescheduleResult:
+        """
+        Atomically move the patient's appointment with the doctor from old_slot
+        to new_slot: both are checked and both rows change together, or nothing does.
+        """
+
+    def reload(self):
+        """Drop any cached state and re-read from storage."""
+
+    def add_change_listener(self, callback):
+        """
+        Call callback(date, doctor_name) after every booking or cancellation
+        this process makes or replays. date is "DD-MM-YYYY". Changes made by
+        other processes are only seen by stores that replay them (CSV journal).
+        """
+        self._listeners.append(callback)
+
+    def _notify_change(self, slot: str, doctor_name: str):
+        date, _ = _parse_slot(slot)
+        if date is None:
+            return
+        for callback in self._listeners:
+            callback(date.strftime("%d-%m-%Y"), doctor_name)
+
+    def _notify_days(self, changes):
+        """_notify_change once per (date, doctor) among [(slot, doctor_name)], for batches."""
+        days = {}
+        for slot, doctor_name in changes:
+            days.setdefault((slot.split(" ")[0], doctor_name), slot)
+        for (_, doctor_name), slot in days.items():
+            self._notify_change(slot, doctor_name)
+
+
+class ScheduleStore(BaseScheduleStore):
+    """
+    Process-wide, in-memory view of data/doctor_availability.csv.
+    The CSV is parsed once; every read is served from memory.
+
+    The CSV is a snapshot: bookings and cancellations are appended to
+    `<csv>.journal` (one JSON line each, with a timestamp, so it doubles as
+    an audit trail) and replayed on top of the snapshot when loading.
+    compact() folds the journal into a fresh snapshot; it runs on demand and
+    automatically every `compact_every` entries.
+
+    Rows go through normalise_schedule() on load, so date_slot is always
+    canonical and backed by a typed `slot` column. They are then held in a
+    ColumnarSchedule (toolkit/columnar.py): integer-coded doctors, minute
+    offsets, patient IDs and a free-slot bitset per doctor and day, so a
+    lookup is a binary search or a few word operations. `df` rebuilds a
+    DataFrame from it on demand.
+
+    Writes are transactional across threads and processes: they hold an
+    exclusive lock on `<csv>.lock`, catch up on whatever other processes
+    have journalled (or reload if they compacted), re-check the slot
+    (compare-and-set) and only then append. Snapshots are published with
+    write-to-temp + rename. Reads catch up too, but only take the lock when
+    the journal or the snapshot changed on disk (see _catch_up()).
+    """
+
+    backend = "csv"
+
+    def __init__(self, csv_path: str = DEFAULT_CSV_PATH, compact_every: int = DEFAULT_COMPACT_EVERY):
+        super().__init__()
+        self.csv_path = csv_path
+        self.lock_path = csv_path + ".lock"
+        self.journal_path = csv_path + ".journal"
+        self.audit_path = csv_path + ".audit"
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._lock_owner = None  # thread holding the file lock
+        self._replayed_changes = []  # (slot, doctor) replayed under the locks, announced after them
+        with self._file_lock():
+            self._reload_locked()
+
+    def _load(self) -> pd.DataFrame:
+        # patient ids are parsed by normalise_schedule, read them untyped
+        raw = pd.read_csv(self.csv_path, dtype={"patient_to_attend": object})
+        df, self._malformed, rewritten = normalise_schedule(raw)
+        if len(self._malformed):
+            logger.warning("Schedule %s: skipping %d malformed row(s):", self.csv_path, len(self._malformed))
+            for line_no, row in self._malformed.iterrows():
+                # +2: header line and 1-based numbering
+                logger.warning("  line %d: %s", line_no + 2, row.to_dict())
+        if rewritten:
+            logger.info("Schedule %s: rewrote %d legacy date_slot value(s) to DD-MM-YYYY HH:MM.", self.csv_path, rewritten)
+            self._write(df)  # callers hold the file lock
+        return df
+
+    def _build_indexes(self, df: pd.DataFrame):
+        # the DataFrame is only kept long enough to build the compact columns
+        self._columns = ColumnarSchedule(df)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """The current rows as a normalised DataFrame (built on demand, not an index)."""
+        self._catch_up()
+        return self._frame()
+
+    def _frame(self) -> pd.DataFrame:
+        """The in-memory rows as a DataFrame, without catching up (safe under the file lock)."""
+        with self._lock:
+            df = self._columns.to_frame()
+        df.insert(0, 'date_slot', df['slot'].dt.strftime(SLOT_FORMAT))
+        df['date'] = df['slot'].dt.date
+        df['time'] = df['slot'].dt.time
+        return df
+
+    def reload(self):
+        """Re-read the CSV from disk (e.g. after it was edited by hand)."""
+        with self._lock, self._file_lock():
+            self._reload_locked()
+        self._announce_replayed()
+
+    def _reload_locked(self):
+        df = self._load()
+        self._disk_version = self._stat()
+        self._build_indexes(df)
+        self._journal_offset = 0
+        self._journal_seen = 0
+        self._journal_entries = 0
+        self._replay_journal()
+
+    # -----------------------------------------
+    # DURABILITY / CONCURRENCY
+    # -----------------------------------------
+    def _stat(self):
+        """Version token of the file on disk; os.replace() always changes the inode."""
+        try:
+            st = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive inter-process lock around the CSV (blocks until acquired)."""
+        with open(self.lock_path, "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            self._lock_owner = threading.get_ident()
+            try:
+                yield
+            finally:
+                self._lock_owner = None
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Serialise a read-check-write against every other writer. Entries other
+        processes have journalled since our last look are replayed (or the
+        whole store reloaded if they compacted) before the caller re-validates
+        its slot. Listeners hear about the replayed changes once both locks
+        are released.
+        """
+        try:
+            with self._lock, self._file_lock():
+                self._sync_locked()
+                yield
+                if self.compact_every and self._journal_entries >= self.compact_every:
+                    self._compact_locked()
+        finally:
+            self._announce_replayed()
+
+    def _sync_locked(self):
+        """Replay other processes' journal entries, or reload if they compacted (file lock held)."""
+        if self._stat() != self._disk_version:
+            self._reload_locked()
+        else:
+            self._replay_journal()
+
+    def _catch_up(self):
+        """
+        Before a read: pick up what other processes wrote since our last look.
+        Costs two stat() calls when nothing changed. Call it without holding
+        self._lock, so replayed changes are announced with no lock held.
+        """
+        if self._lock_owner == threading.get_ident():
+            return  # inside our own transaction, already caught up
+        try:
+            journal_size = os.stat(self.journal_path).st_size
+        except FileNotFoundError:
+            journal_size = 0
+        version = self._stat()
+        # a removed snapshot has nothing to catch up with: keep serving the rows in memory
+        if version is None or (journal_size == self._journal_seen and version == self._disk_version):
+            return
+        with self._lock, self._file_lock():
+            self._sync_locked()
+        self._announce_replayed()
+
+    def _announce_replayed(self):
+        """Pass changes replayed from the journal on to the listeners, outside the store's locks."""
+        with self._lock:
+            changes, self._replayed_changes = self._replayed_changes, []
+        if changes:
+            self._notify_days(changes)
+
+    # -----------------------------------------
+    # JOURNAL
+    # -----------------------------------------
+    def _replay_journal(self):
+        """Apply journal entries past self._journal_offset to the in-memory rows."""
+        try:
+            with open(self.journal_path, "rb") as fh:
+                fh.seek(self._journal_offset)
+                data = fh.read()
+        except FileNotFoundError:
+            return
+        # bytes looked at, a torn tail included: _catch_up() only reacts to growth past it
+        self._journal_seen = self._journal_offset + len(data)
+        # a torn last line (crash mid-append) is ignored and overwritten by the next append
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["op"] == "book_many":
+                self._replay_bookings(entry["bookings"])
+                continue
+            pos = self._row(entry["slot"], entry["doctor"])
+            if pos is None:
+                logger.warning("Journal %s: unknown slot %s / %s, skipped.", self.journal_path, entry['slot'], entry['doctor'])
+                continue
+            if entry["op"] == "book":
+                self._set_row(pos, False, patient_id(entry["patient"]))
+            elif entry["op"] == "cancel":
+                self._set_row(pos, True, None)
+            elif entry["op"] == "reschedule":
+                new_pos = self._row(entry["new_slot"], entry["doctor"])
+                if new_pos is None:
+                    logger.warning("Journal %s: unknown slot %s / %s, skipped.", self.journal_path, entry['new_slot'], entry['doctor'])
+                    continue
+                self._set_row(pos, True, None)
+                self._set_row(new_pos, False, patient_id(entry["patient"]))
+                self._replayed_changes.append((entry["new_slot"], entry["doctor"]))
+            self._replayed_changes.append((entry["slot"], entry["doctor"]))
+            self._journal_entries += 1
+        self._journal_offset += len(complete)
+
+    def _replay_bookings(self, bookings: list):
+        """Apply one "book_many" journal entry: [[slot, doctor, patient], ...]."""
+        for slot, doctor, patient in bookings:
+            pos = self._row(slot, doctor)
+            if pos is None:
+                logger.warning("Journal %s: unknown slot %s / %s, skipped.", self.journal_path, slot, doctor)
+                continue
+            self._set_row(pos, False, patient_id(patient))
+        self._replayed_changes += [(slot, doctor) for slot, doctor, _ in bookings]
+        self._journal_entries += len(bookings)
+
+    def _append_journal(self, entry: dict, entries: int = 1):
+        """entries: how many changes the line carries, so compaction counts a batch at its size."""
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as fh:
+            if fh.tell() != self._journal_offset:
+                fh.truncate(self._journal_offset)
+            fh.write(line)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._journal_offset += len(line)
+        self._journal_seen = self._journal_offset
+        self._journal_entries += entries
+
+    def compact(self):
+        """Fold the journal into a new CSV snapshot and start an empty journal."""
+        with self._transaction():
+            self._compact_locked()
+
+    def _compact_locked(self):
+        if not self._journal_entries:
+            return
+        self._write(self._frame())
+        self._disk_version = self._stat()
+        # the snapshot is durable; keep the folded entries for auditing and reset the journal
+        with open(self.journal_path, "rb") as src, open(self.audit_path, "ab") as audit:
+            audit.write(src.read(self._journal_offset))
+            audit.flush()
+            os.fsync(audit.fileno())
+        with open(self.journal_path, "wb") as fh:
+            os.fsync(fh.fileno())
+        self._journal_offset = 0
+        self._journal_seen = 0
+        self._journal_entries = 0
+
+    def _write(self, df: pd.DataFrame):
+        # malformed rows are not served, but they are never dropped from disk either
+        out = pd.concat([df[CSV_COLUMNS], self._malformed[CSV_COLUMNS]])
+        directory = os.path.dirname(os.path.abspath(self.csv_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".schedule-", suffix=".csv.tmp", dir=directory)
+        try:
+            if os.path.exists(self.csv_path):
+                os.chmod(tmp_path, os.stat(self.csv_path).st_mode & 0o777)
+            with os.fdopen(fd, "w", newline="") as fh:
+                out.to_csv(fh, index=False)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, self.csv_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _set_row(self, pos: int, is_available: bool, patient):
+        self._columns.set(pos, is_available, patient)
+
+    def _row(self, slot: str, doctor_name: str):
+        return self._columns.row(*_parse_slot(slot), doctor_name)
+
+    def _slot(self, pos: int) -> str:
+        return self._columns.slot_of(pos).strftime(SLOT_FORMAT)
+
+    # -----------------------------------------
+    # READS
+    # -----------------------------------------
+    def doctors(self) -> dict:
+        self._catch_up()
+        with self._lock:
+            columns = self._columns
+            return {
+                name: columns.specialization_names[columns.doctor_specialization[code]]
+                for code, name in enumerate(columns.doctor_names)
+            }
+
+    def _doctor_codes(self, doctor_name: str = None, specialization: str = None) -> list:
+        if doctor_name:
+            code = self._columns.doctor_code(doctor_name)
+            return [] if code is None else [code]
+        return self._columns.specialization_doctors(specialization)
+
+    def available_times(self, date: str, doctor_name: str) -> list:
+        """Free "HH:MM" slots for a doctor on "DD-MM-YYYY", in time order."""
+        date = _parse_date(date)
+        self._catch_up()
+        with self._lock:
+            code = self._columns.doctor_code(doctor_name)
+            if date is None or code is None:
+                return []
+            day = self._columns.day(date)
+            return [self._columns.time_label(m) for m in self._columns.free_minutes(code, day, day + 1).tolist()]
+
+    def available_by_specialization(self, date: str, specialization: str) -> dict:
+        """Free slots for every doctor of a specialization: {doctor_name: ["HH:MM", ...]}, earliest first."""
+        date = _parse_date(date)
+        if date is None:
+            return {}
+        self._catch_up()
+        with self._lock:
+            columns = self._columns
+            day = columns.day(date)
+            free = [(code, columns.free_minutes(code, day, day + 1)) for code in columns.specialization_doctors(specialization)]
+            free = sorted((f for f in free if len(f[1])), key=lambda f: f[1][0])
+            return {columns.doctor_names[code]: [columns.time_label(m) for m in minutes.tolist()] for code, minutes in free}
+
+    def is_available(self, slot: str, doctor_name: str) -> bool:
+        """slot: "DD-MM-YYYY HH:MM"."""
+        self._catch_up()
+        with self._lock:
+            pos = self._row(slot, doctor_name)
+            return pos is not None and bool(self._columns.is_free(pos))
+
+    def available_doctors_at(self, slot: str, specialization: str) -> list:
+        """Doctors of a specialization that are free at slot "DD-MM-YYYY HH:MM"."""
+        date, time = _parse_slot(slot)
+        if date is None:
+            return []
+        self._catch_up()
+        with self._lock:
+            columns = self._columns
+            doctors = [columns.doctor_names[code] for code in columns.specialization_doctors(specialization)]
+            rows = [columns.row(date, time, doctor) for doctor in doctors]
+            return [doctor for doctor, pos in zip(doctors, rows) if pos is not None and columns.is_free(pos)]
+
+    def nearest_available(self, slot: str, doctor_name: str = None, specialization: str = None,
+                          k: int = 5, day_window: int = 0) -> list:
+        date, time = _parse_slot(slot)
+        if date is None:
+            return []
+        self._catch_up()
+        with self._lock:
+            columns = self._columns
+            day = columns.day(date)
+            target = day * 24 * 60 + time.hour * 60 + time.minute
+            # every doctor contributes the free slots of their bitsets inside the window
+            minutes, doctors = [], []
+            for code in self._doctor_codes(doctor_name, specialization):
+                free = columns.free_minutes(code, day - day_window, day + day_window + 1)
+                minutes.append(free)
+                doctors.append(np.full(len(free), code))
+            if not minutes:
+                return []
+            minutes, doctors = np.concatenate(minutes), np.concatenate(doctors)
+            nearest = np.lexsort((minutes, np.abs(minutes - target)))[:k]
+            return [
+                (columns.slot_at(minutes[i]).strftime(SLOT_FORMAT), columns.doctor_names[doctors[i]])
+                for i in nearest.tolist()
+            ]
+
+    def available_in_range(self, start_date: str, end_date: str, doctor_name: str = None,
+                           specialization: str = None, time_from: str = None, time_to: str = None) -> dict:
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        if start is None or end is None or end < start:
+            return {}
+        first, last = _time_window(time_from, time_to)
+        self._catch_up()
+        with self._lock:
+            columns = self._columns
+            mask = columns.time_mask(first, last)
+            first_day, end_day = columns.day(start), columns.day(end) + 1
+            # (minute, doctor) of every free slot in the window, in time order
+            minutes, doctors = [], []
+            for code in self._doctor_codes(doctor_name, specialization):
+                free = columns.free_minutes(code, first_day, end_day, mask)
+                minutes.append(free)
+                doctors.append(np.full(len(free), code))
+            if not minutes:
+                return {}
+            minutes, doctors = np.concatenate(minutes), np.concatenate(doctors)
+            result = {}
+            for i in np.argsort(minutes, kind='stable').tolist():
+                day = columns.slot_at(minutes[i]).strftime("%d-%m-%Y")
+                result.setdefault(day, {}).setdefault(columns.doctor_names[doctors[i]], []).append(columns.time_label(minutes[i]))
+            return result
+
+    def appointments(self, id_number) -> list:
+        self._catch_up()
+        with self._lock:
+            columns = self._columns
+            rows = sorted(columns.by_patient.get(patient_id(id_number), ()), key=lambda i: (columns.minutes[i], i))
+            return [(self._slot(i), columns.doctor_of(i)) for i in rows]
+
+    # -----------------------------------------
+    # WRITES
+    # -----------------------------------------
+    def _apply(self, pos: int, op: str, patient=None):
+        """Journal a book/cancel for one row; the in-memory row is restored if the append fails."""
+        previous = (bool(self._columns.is_free(pos)), self._columns.patient_of(pos))
+        self._set_row(pos, op == "cancel", patient)
+        try:
+            self._append_journal({
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "op": op,
+                "slot": self._slot(pos),
+                "doctor": self._columns.doctor_of(pos),
+                "patient": patient if op == "book" else previous[1],
+            })
+        except BaseException:
+            self._set_row(pos, *previous)
+            raise
+
+    def book(self, slot: str, doctor_name: str, id_number) -> bool:
+        """Mark a free slot as taken by the patient. Returns False if it is not free."""
+        patient = patient_id(id_number)
+        if patient is None:
+            raise ValueError(f"Invalid patient ID {id_number!r}; expected a positive whole number.")
+        key = (*_parse_slot(slot), doctor_name)
+        with self._transaction():
+            pos = self._columns.row(*key)
+            if pos is None or not self._columns.is_free(pos):
+                return False
+            self._apply(pos, "book", patient)
+        self._notify_change(slot, doctor_name)
+        return True
+
+    def cancel(self, slot: str, doctor_name: str, id_number) -> bool:
+        """Free a slot held by the patient. Returns False if there is no such appointment."""
+        key = (*_parse_slot(slot), doctor_name)
+        with self._transaction():
+            pos = self._columns.row(*key)
+            if pos is None or self._columns.patient_of(pos) is None or self._columns.patient_of(pos) != patient_id(id_number):
+                return False
+            self._apply(pos, "cancel")
+        self._notify_change(slot, doctor_name)
+        return True
+
+    def book_many(self, bookings) -> list:
+        """One transaction, one journal line (and one fsync) for the whole batch."""
+        parsed, results = _validate_bookings(bookings)
+        claimed = {}  # row position -> patient
+        with self._transaction():
+            for i, (key, patient) in enumerate(parsed):
+                if results[i] is not None:
+                    continue
+                pos = self._columns.row(*key)
+                if pos is None:
+                    results[i] = BookingResult.UNKNOWN_SLOT
+                elif pos in claimed:
+                    results[i] = BookingResult.DUPLICATE
+                elif not self._columns.is_free(pos):
+                    results[i] = BookingResult.SLOT_TAKEN
+                else:
+                    claimed[pos] = patient
+                    results[i] = BookingResult.BOOKED
+            if not claimed:
+                return results
+
+            try:
+                for pos, patient in claimed.items():
+                    self._set_row(pos, False, patient)
+                self._append_journal({
+                    "ts": datetime.now().isoformat(timespec="seconds"),
+                    "op": "book_many",
+                    "bookings": [[self._slot(pos), self._columns.doctor_of(pos), patient] for pos, patient in claimed.items()],
+                }, entries=len(claimed))
+            except BaseException:
+                for pos in claimed:
+                    self._set_row(pos, True, None)
+                raise
+        self._notify_days((self._slot(pos), self._columns.doctor_of(pos)) for pos in claimed)
+        return results
+
+    def reschedule(self, old_slot: str, new_slot: str, doctor_name: str, id_number) -> RescheduleResult:
+        """One transaction, one journal line: both rows change or neither does."""
+        patient = patient_id(id_number)
+        old_key = (*_parse_slot(old_slot), doctor_name)
+        new_key = (*_parse_slot(new_slot), doctor_name)
+        with self._transaction():
+            old_pos, new_pos = self._columns.row(*old_key), self._columns.row(*new_key)
+            if old_pos is None or patient is None or self._columns.patient_of(old_pos) != patient:
+                return RescheduleResult.NOT_BOOKED
+            if new_pos is None:
+                return RescheduleResult.UNKNOWN_SLOT
+            if new_pos == old_pos:
+                return RescheduleResult.SAME_SLOT
+            if not self._columns.is_free(new_pos):
+                return RescheduleResult.SLOT_TAKEN
+
+            self._set_row(old_pos, True, None)
+            self._set_row(new_pos, False, patient)
+            try:
+                self._append_journal({
+                    "ts": datetime.now().isoformat(timespec="seconds"),
+                    "op": "reschedule",
+                    "slot": self._slot(old_pos),
+                    "new_slot": self._slot(new_pos),
+                    "doctor": doctor_name,
+                    "patient": patient,
+                })
+            except BaseException:
+                self._set_row(new_pos, True, None)
+                self._set_row(old_pos, False, patient)
+                raise
+        self._notify_change(old_slot, doctor_name)
+        self._notify_change(new_slot, doctor_name)
+        return RescheduleResult.RESCHEDULED
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_schedule_store() -> BaseScheduleStore:
+    """
+    Return the shared store, creating it on first use.
+    SCHEDULE_BACKEND picks the storage: "csv" (default) or "sqlite".
+    The SQLite database is imported from the CSV if it doesn't exist yet.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_store(os.getenv("SCHEDULE_BACKEND", "csv").lower())
+    return _store
+
+
+def _create_store(backend: str) -> BaseScheduleStore:
+    csv_path = os.getenv("SCHEDULE_CSV_PATH", DEFAULT_CSV_PATH)
+    if backend == "csv":
+        return ScheduleStore(
+            csv_path,
+            compact_every=int(os.getenv("SCHEDULE_COMPACT_EVERY", DEFAULT_COMPACT_EVERY)),
+        )
+    if backend == "sqlite":
+        from toolkit.sqlite_store import SQLiteScheduleStore, import_csv
+
+        db_path = os.getenv("SCHEDULE_DB_PATH", DEFAULT_DB_PATH)
+        if not os.path.exists(db_path):
+            import_csv(csv_path, db_path)
+        return SQLiteScheduleStore(db_path)
+    raise ValueError(f"Unknown SCHEDULE_BACKEND {backend!r}; expected 'csv' or 'sqlite'.")
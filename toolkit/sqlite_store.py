@@ -0,0 +1,335 @@
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from toolkit.schedule_store import (
+    DEFAULT_CSV_PATH,
+    DEFAULT_DB_PATH,
+    BaseScheduleStore,
+    BookingResult,
+    RescheduleResult,
+    ScheduleStore,
+    patient_id,
+    _time_window,
+    _validate_bookings,
+    _window_bounds,
+)
+from utils.log import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    id INTEGER PRIMARY KEY,
+    slot TEXT NOT NULL,              -- "YYYY-MM-DD HH:MM", sorts chronologically
+    date TEXT NOT NULL,              -- "YYYY-MM-DD"
+    time TEXT NOT NULL,              -- "HH:MM"
+    doctor_name TEXT NOT NULL,
+    specialization TEXT NOT NULL,
+    is_available INTEGER NOT NULL,
+    patient_to_attend INTEGER,
+    UNIQUE (slot, doctor_name)
+);
+CREATE INDEX IF NOT EXISTS idx_slots_date_doctor ON slots (date, doctor_name, time);
+CREATE INDEX IF NOT EXISTS idx_slots_date_specialization ON slots (date, specialization, time);
+CREATE INDEX IF NOT EXISTS idx_slots_patient ON slots (patient_to_attend);
+"""
+
+# databases imported before IDs were integers hold them as text such as "1000082.0"
+MIGRATE_PATIENT_IDS = """
+UPDATE slots SET patient_to_attend = CAST(CAST(patient_to_attend AS REAL) AS INTEGER)
+WHERE patient_to_attend IS NOT NULL AND patient_to_attend != CAST(CAST(patient_to_attend AS REAL) AS INTEGER);
+"""
+
+
+def _iso_date(date: str):
+    """"DD-MM-YYYY" -> "YYYY-MM-DD", or None."""
+    try:
+        return datetime.strptime(date.strip(), "%d-%m-%Y").strftime("%Y-%m-%d")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _iso_slot(slot: str):
+    """"DD-MM-YYYY HH:MM" -> "YYYY-MM-DD HH:MM", or None."""
+    try:
+        return datetime.strptime(slot.strip(), "%d-%m-%Y %H:%M").strftime("%Y-%m-%d %H:%M")
+    except (ValueError, AttributeError):
+        return None
+
+
+def import_csv(csv_path: str = DEFAULT_CSV_PATH, db_path: str = DEFAULT_DB_PATH) -> int:
+    """
+    One-shot import of the CSV schedule (snapshot + journal) into a new
+    SQLite database. The database is built under a temporary name and
+    linked into place, so concurrent importers can't clobber each other.
+    Returns the number of imported slots (0 if db_path already existed).
+    """
+    df = ScheduleStore(csv_path, compact_every=0).df
+    rows = [
+        (
+            slot.strftime("%Y-%m-%d %H:%M"),
+            slot.strftime("%Y-%m-%d"),
+            slot.strftime("%H:%M"),
+            doctor,
+            specialization,
+            int(available),
+            None if available else patient_id(patient),
+        )
+        for slot, doctor, specialization, available, patient in zip(
+            df['slot'], df['doctor_name'], df['specialization'], df['is_available'], df['patient_to_attend']
+        )
+    ]
+
+    tmp_path = f"{db_path}.import-{os.getpid()}"
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO slots (slot, date, time, doctor_name, specialization, is_available, patient_to_attend) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    try:
+        os.link(tmp_path, db_path)
+    except FileExistsError:
+        return 0
+    finally:
+        os.remove(tmp_path)
+    logger.info("Imported %d slots from %s into %s.", len(rows), csv_path, db_path)
+    return len(rows)
+
+
+class SQLiteScheduleStore(BaseScheduleStore):
+    """
+    Schedule backed by a SQLite database (see import_csv()).
+    Reads are indexed queries on (date, doctor) / (date, specialization);
+    book and cancel are single conditional UPDATEs, so the row-level
+    compare-and-set is done by SQLite itself and holds across uvicorn workers.
+    reschedule and book_many check and update their rows inside one BEGIN
+    IMMEDIATE transaction.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        super().__init__()
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA + MIGRATE_PATIENT_IDS)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -----------------------------------------
+    # READS
+    # -----------------------------------------
+    def doctors(self) -> dict:
+        rows = self._conn().execute("SELECT DISTINCT doctor_name, specialization FROM slots")
+        return dict(rows.fetchall())
+
+    def available_times(self, date: str, doctor_name: str) -> list:
+        rows = self._conn().execute(
+            "SELECT time FROM slots WHERE date = ? AND doctor_name = ? AND is_available = 1 ORDER BY time",
+            (_iso_date(date), doctor_name),
+        )
+        return [time for (time,) in rows]
+
+    def available_by_specialization(self, date: str, specialization: str) -> dict:
+        rows = self._conn().execute(
+            "SELECT doctor_name, time FROM slots "
+            "WHERE date = ? AND specialization = ? AND is_available = 1 ORDER BY time",
+            (_iso_date(date), specialization),
+        )
+        result = {}
+        for doctor, time in rows:
+            result.setdefault(doctor, []).append(time)
+        return result
+
+    def is_available(self, slot: str, doctor_name: str) -> bool:
+        row = self._conn().execute(
+            "SELECT is_available FROM slots WHERE slot = ? AND doctor_name = ?",
+            (_iso_slot(slot), doctor_name),
+        ).fetchone()
+        return bool(row and row[0])
+
+    def available_doctors_at(self, slot: str, specialization: str) -> list:
+        iso = _iso_slot(slot)
+        if iso is None:
+            return []
+        date, time = iso.split(" ")
+        rows = self._conn().execute(
+            "SELECT doctor_name FROM slots "
+            "WHERE date = ? AND specialization = ? AND time = ? AND is_available = 1",
+            (date, specialization, time),
+        )
+        return [doctor for (doctor,) in rows]
+
+    def nearest_available(self, slot: str, doctor_name: str = None, specialization: str = None,
+                          k: int = 5, day_window: int = 0) -> list:
+        iso = _iso_slot(slot)
+        if iso is None:
+            return []
+        start, end = _window_bounds(datetime.strptime(iso, "%Y-%m-%d %H:%M").date(), day_window)
+        column, value = ("doctor_name", doctor_name) if doctor_name else ("specialization", specialization)
+        rows = self._conn().execute(
+            f"SELECT slot, doctor_name FROM slots "
+            f"WHERE {column} = ? AND date >= ? AND date < ? AND is_available = 1 "
+            f"ORDER BY ABS(julianday(slot) - julianday(?)), slot LIMIT ?",
+            (value, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), iso, k),
+        )
+        return [
+            (datetime.strptime(s, "%Y-%m-%d %H:%M").strftime("%d-%m-%Y %H:%M"), doctor)
+            for s, doctor in rows
+        ]
+
+    def available_in_range(self, start_date: str, end_date: str, doctor_name: str = None,
+                           specialization: str = None, time_from: str = None, time_to: str = None) -> dict:
+        start, end = _iso_date(start_date), _iso_date(end_date)
+        if start is None or end is None or end < start:
+            return {}
+        first, last = _time_window(time_from, time_to)
+        column, value = ("doctor_name", doctor_name) if doctor_name else ("specialization", specialization)
+        rows = self._conn().execute(
+            f"SELECT slot, doctor_name, time FROM slots "
+            f"WHERE {column} = ? AND date BETWEEN ? AND ? AND time >= ? AND time < ? AND is_available = 1 "
+            f"ORDER BY slot",
+            (value, start, end, f"{first // 60:02d}:{first % 60:02d}", f"{last // 60:02d}:{last % 60:02d}"),
+        )
+        result = {}
+        for slot, doctor, time in rows:
+            day = datetime.strptime(slot[:10], "%Y-%m-%d").strftime("%d-%m-%Y")
+            result.setdefault(day, {}).setdefault(doctor, []).append(time)
+        return result
+
+    def appointments(self, id_number) -> list:
+        rows = self._conn().execute(
+            "SELECT slot, doctor_name FROM slots WHERE patient_to_attend = ? ORDER BY slot",
+            (patient_id(id_number),),
+        )
+        return [
+            (datetime.strptime(s, "%Y-%m-%d %H:%M").strftime("%d-%m-%Y %H:%M"), doctor)
+            for s, doctor in rows
+        ]
+
+    # -----------------------------------------
+    # WRITES
+    # -----------------------------------------
+    def book(self, slot: str, doctor_name: str, id_number) -> bool:
+        patient = patient_id(id_number)
+        if patient is None:
+            raise ValueError(f"Invalid patient ID {id_number!r}; expected a positive whole number.")
+        cur = self._conn().execute(
+            "UPDATE slots SET is_available = 0, patient_to_attend = ? "
+            "WHERE slot = ? AND doctor_name = ? AND is_available = 1",
+            (patient, _iso_slot(slot), doctor_name),
+        )
+        if cur.rowcount != 1:
+            return False
+        self._notify_change(slot, doctor_name)
+        return True
+
+    def cancel(self, slot: str, doctor_name: str, id_number) -> bool:
+        cur = self._conn().execute(
+            "UPDATE slots SET is_available = 1, patient_to_attend = NULL "
+            "WHERE slot = ? AND doctor_name = ? AND patient_to_attend = ?",
+            (_iso_slot(slot), doctor_name, patient_id(id_number)),
+        )
+        if cur.rowcount != 1:
+            return False
+        self._notify_change(slot, doctor_name)
+        return True
+
+    def book_many(self, bookings) -> list:
+        parsed, results = _validate_bookings(bookings)
+        claimed = {}  # row id -> (patient, slot, doctor)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for i, ((date, time, doctor_name), patient) in enumerate(parsed):
+                if results[i] is not None:
+                    continue
+                row = conn.execute(
+                    "SELECT id, is_available FROM slots WHERE slot = ? AND doctor_name = ?",
+                    (f"{date:%Y-%m-%d} {time:%H:%M}", doctor_name),
+                ).fetchone()
+                if row is None:
+                    results[i] = BookingResult.UNKNOWN_SLOT
+                elif row[0] in claimed:
+                    results[i] = BookingResult.DUPLICATE
+                elif not row[1]:
+                    results[i] = BookingResult.SLOT_TAKEN
+                else:
+                    claimed[row[0]] = (patient, bookings[i][0], doctor_name)
+                    results[i] = BookingResult.BOOKED
+            conn.executemany(
+                "UPDATE slots SET is_available = 0, patient_to_attend = ? WHERE id = ?",
+                [(patient, row_id) for row_id, (patient, _, _) in claimed.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._notify_days((slot, doctor_name) for _, slot, doctor_name in claimed.values())
+        return results
+
+    def reschedule(self, old_slot: str, new_slot: str, doctor_name: str, id_number) -> RescheduleResult:
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, so nobody can book new_slot between check and update
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = self._reschedule_in_transaction(conn, _iso_slot(old_slot), _iso_slot(new_slot), doctor_name, patient_id(id_number))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if result is RescheduleResult.RESCHEDULED:
+            self._notify_change(old_slot, doctor_name)
+            self._notify_change(new_slot, doctor_name)
+        return result
+
+    @staticmethod
+    def _reschedule_in_transaction(conn, old_iso, new_iso, doctor_name, patient) -> RescheduleResult:
+        def row(slot):
+            return conn.execute(
+                "SELECT id, is_available, patient_to_attend FROM slots WHERE slot = ? AND doctor_name = ?",
+                (slot, doctor_name),
+            ).fetchone()
+
+        old = row(old_iso)
+        if old is None or patient is None or patient_id(old[2]) != patient:
+            return RescheduleResult.NOT_BOOKED
+        new = row(new_iso)
+        if new is None:
+            return RescheduleResult.UNKNOWN_SLOT
+        if new[0] == old[0]:
+            return RescheduleResult.SAME_SLOT
+        if not new[1]:
+            return RescheduleResult.SLOT_TAKEN
+        conn.execute("UPDATE slots SET is_available = 1, patient_to_attend = NULL WHERE id = ?", (old[0],))
+        conn.execute("UPDATE slots SET is_available = 0, patient_to_attend = ? WHERE id = ?", (patient, new[0]))
+        return RescheduleResult.RESCHEDULED
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the CSV schedule into SQLite.")
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+    configure_logging()
+    if not import_csv(args.csv, args.db):
+        print(f"{args.db} already exists; nothing imported.")
@@ -1,6 +1,25 @@
-import pandas as pd
-from typing import Literal
+import os
 from langchain_core.tools import tool
+from toolkit.schedule_store import get_schedule_store, RescheduleResult
+
+# days either side of the requested date searched for alternatives to a taken slot
+SLOT_SEARCH_DAYS = int(os.getenv("SLOT_SEARCH_DAYS", 1))
+# longest range check_availability_range answers in one call
+MAX_RANGE_DAYS = 31
+
+# doctor_name / specialization are plain strings here; the agents bind copies
+# whose schemas list the store's current roster (toolkit/registry.py)
+
+
+def convert_to_am_pm(time_str):
+    """Convert 24-hour "HH:MM" to casual 12-hour time ("8 AM", "8:30 AM"); anything else is returned as is"""
+    try:
+        hours, minutes = map(int, str(time_str).split(":"))
+    except ValueError:
+        return time_str
+    period = "AM" if hours < 12 else "PM"
+    hours = hours % 12 or 12
+    return f"{hours}:{minutes:02d} {period}" if minutes > 0 else f"{hours} {period}"
 
 
 # -----------------------------------------
@@ -9,26 +28,13 @@ from langchain_core.tools import tool
 @tool
 def check_availability_by_doctor(
     date: str,
-    doctor_name: Literal[
-        'kevin anderson','robert martinez','susan davis','daniel miller',
-        'sarah wilson','michael green','lisa brown','jane smith',
-        'emily johnson','john doe'
-    ]
+    doctor_name: str
 ):
     """
     Check availability for a specific doctor on a given date.
     date: "DD-MM-YYYY"
     """
-    df = pd.read_csv("data/doctor_availability.csv")
-    df['date_slot_time'] = df['date_slot'].apply(lambda x: x.split(" ")[-1])
-
-    rows = list(
-        df[
-            (df['date_slot'].apply(lambda x: x.split(" ")[0]) == date)
-            & (df['doctor_name'] == doctor_name)
-            & (df['is_available'] == True)
-        ]['date_slot_time']
-    )
+    rows = get_schedule_store().available_times(date, doctor_name)
 
     if not rows:
         return "No availability in the entire day."
@@ -50,11 +56,11 @@ def check_specific_slot(
     specialization: str = None  # Optional: if provided, check for specialization
 ):
     """
-    Check if a specific time slot is available and return nearby alternatives if not.
+    Check if a specific time slot is available and return the nearest alternatives if not.
     date: "DD-MM-YYYY", time: "HH:MM" (24-hour format like "20:00" for 8PM)
     Returns: Status of the slot and nearby alternatives.
     """
-    df = pd.read_csv("data/doctor_availability.csv")
+    store = get_schedule_store()
     
     from datetime import datetime, timedelta
     
@@ -70,95 +76,58 @@ def check_specific_slot(
         except:
             return f"Invalid time format. Please use HH:MM (24-hour) or HH:MM AM/PM format."
     
-    # Format the full datetime slot - CSV uses "DD-MM-YYYY HH:MM" format
+    # Format the full datetime slot - the store keeps every slot as "DD-MM-YYYY HH:MM"
     date_slot_str = f"{date} {time_str}"
     
-    # The CSV format can be "DD-MM-YYYY HH:MM" (with colon) or "DD-MM-YYYY H.MM" (with dot)
-    # Try both formats when checking
-    formatted_slot_colon = date_slot_str
-    formatted_slot_dot = date_slot_str.replace(":", ".")
-    
-    def convert_to_am_pm(time_str):
-        """Convert 24-hour time to natural 12-hour AM/PM format (simple and casual)"""
-        try:
-            # Handle both colon and dot formats
-            time_clean = str(time_str).replace(".", ":")
-            hours, minutes = map(int, time_clean.split(":"))
-            period = "AM" if hours < 12 else "PM"
-            hours = hours % 12 or 12
-            # If minutes are 00, just show hour (e.g., "8 AM" not "8:00 AM")
-            # If minutes are 30, show "8:30 AM"
-            if minutes == 0:
-                return f"{hours} {period}"
-            else:
-                return f"{hours}:{minutes:02d} {period}"
-        except:
-            return time_str
+    def describe(slot):
+        """"DD-MM-YYYY HH:MM" -> "8 AM", or "8 AM on 08-08-2024" for another day"""
+        slot_date, slot_time = slot.split(" ")
+        when = convert_to_am_pm(slot_time)
+        return when if slot_date == date else f"{when} on {slot_date}"
     
     # Check if specific slot is available
     if doctor_name:
-        # Check for specific doctor - try both formats
-        slot = df[
-            ((df['date_slot'] == formatted_slot_colon) | (df['date_slot'] == formatted_slot_dot))
-            & (df['doctor_name'] == doctor_name.lower())
-            & (df['is_available'] == True)
-        ]
-        
-        if len(slot) > 0:
+        # Check for specific doctor
+        if store.is_available(date_slot_str, doctor_name.lower()):
             time_display = convert_to_am_pm(time_str)
             return f"YES_AVAILABLE: That time slot is available for Dr. {doctor_name.title()} on {date} at {time_display}."
         
-        # Get nearby alternatives for same doctor
-        same_date_slots = df[
-            (df['date_slot'].apply(lambda x: x.split(" ")[0]) == date)
-            & (df['doctor_name'] == doctor_name.lower())
-            & (df['is_available'] == True)
-        ]
+        # Nearest free slots for the same doctor, by time distance
+        nearest = store.nearest_available(date_slot_str, doctor_name=doctor_name.lower(), k=5, day_window=SLOT_SEARCH_DAYS)
         
-        if len(same_date_slots) > 0:
-            alternatives = same_date_slots['date_slot'].apply(lambda x: x.split(" ")[-1]).tolist()[:5]
-            # Handle both colon and dot formats, convert to natural format
-            alt_times = [convert_to_am_pm(t.replace(".", ":")) if "." in t else convert_to_am_pm(t) for t in alternatives]
-            return f"NOT_AVAILABLE: The requested time is not available. Here are other times on {date} for Dr. {doctor_name.title()}: {', '.join(alt_times)}"
+        if len(nearest) > 0:
+            alt_times = [describe(slot) for slot, _ in nearest]
+            return f"NOT_AVAILABLE: The requested time is not available. Here are the closest times for Dr. {doctor_name.title()}: {', '.join(alt_times)}"
         else:
-            return f"NOT_AVAILABLE: No slots available for Dr. {doctor_name.title()} on {date}."
+            return f"NOT_AVAILABLE: No slots available for Dr. {doctor_name.title()} around {date}."
     
     elif specialization:
-        # Check for specialization - try both formats
-        slot = df[
-            ((df['date_slot'] == formatted_slot_colon) | (df['date_slot'] == formatted_slot_dot))
-            & (df['specialization'] == specialization)
-            & (df['is_available'] == True)
-        ]
+        # Check for specialization
+        doctors = store.available_doctors_at(date_slot_str, specialization)
         
-        if len(slot) > 0:
-            doctors = slot['doctor_name'].unique().tolist()
+        if len(doctors) > 0:
             time_display = convert_to_am_pm(time_str)
             doctor_list = ', '.join([f"Dr. {d.title()}" for d in doctors])
             return f"YES_AVAILABLE: That time is available on {date} at {time_display} with {doctor_list}."
         
-        # Get nearby alternatives and doctors
-        same_date_slots = df[
-            (df['date_slot'].apply(lambda x: x.split(" ")[0]) == date)
-            & (df['specialization'] == specialization)
-            & (df['is_available'] == True)
-        ]
+        # Nearest free slots across every doctor of the specialization
+        nearest = store.nearest_available(date_slot_str, specialization=specialization, k=9, day_window=SLOT_SEARCH_DAYS)
         
-        if len(same_date_slots) > 0:
-            # Group by doctor and get top slots
-            grouped = same_date_slots.groupby('doctor_name')['date_slot'].apply(
-                lambda x: [t.split(" ")[-1] for t in x[:3]]
-            ).to_dict()
+        if len(nearest) > 0:
+            # Group by doctor (closest doctor first) and keep their top slots
+            grouped = {}
+            for slot, doc in nearest:
+                grouped.setdefault(doc, []).append(slot)
             
-            output = f"NOT_AVAILABLE: That time isn't available. Here are other options on {date}: "
+            output = "NOT_AVAILABLE: That time isn't available. Here are the closest options: "
             doctor_times = []
-            for doc, times in list(grouped.items())[:3]:
-                time_list = [convert_to_am_pm(t.replace(".", ":")) if "." in t else convert_to_am_pm(t) for t in times]
+            for doc, slots in list(grouped.items())[:3]:
+                time_list = [describe(slot) for slot in slots[:3]]
                 doctor_times.append(f"Dr. {doc.title()} - {', '.join(time_list)}")
             output += " | ".join(doctor_times)
             return output
         else:
-            return f"NOT_AVAILABLE: No slots available for {specialization} on {date}."
+            return f"NOT_AVAILABLE: No slots available for {specialization} around {date}."
     
     else:
         return "Please specify either doctor_name or specialization to check availability."
@@ -170,169 +139,182 @@ def check_specific_slot(
 @tool
 def check_availability_by_specialization(
     date: str,
-    specialization: Literal[
-        "general_dentist", "cosmetic_dentist", "prosthodontist", 
-        "pediatric_dentist", "emergency_dentist", 
-        "oral_surgeon", "orthodontist"
-    ]
+    specialization: str
 ):
     """
     Check availability for a specialization on a given date.
     date: "DD-MM-YYYY"
     """
 
-    df = pd.read_csv("data/doctor_availability.csv")
-    df['date_slot_time'] = df['date_slot'].apply(lambda x: x.split(' ')[-1])
-
-    rows = df[
-        (df['date_slot'].apply(lambda x: x.split(" ")[0]) == date)
-        & (df['specialization'] == specialization)
-        & (df['is_available'] == True)
-    ].groupby(['specialization', 'doctor_name'])['date_slot_time'].apply(list).reset_index(name='available_slots')
+    rows = get_schedule_store().available_by_specialization(date, specialization)
 
     if len(rows) == 0:
         return "No availability in the entire day."
 
-    def convert_to_am_pm(time_str):
-        """Convert 24-hour time to natural 12-hour AM/PM format"""
-        try:
-            time_clean = str(time_str).replace(".", ":")
-            hours, minutes = map(int, time_clean.split(":"))
-            period = "AM" if hours < 12 else "PM"
-            hours = hours % 12 or 12
-            return f"{hours}:{minutes:02d} {period}" if minutes > 0 else f"{hours} {period}"
-        except:
-            return time_str
-
     output = f"Availability for {date}\n"
-    for row in rows.values:
-        doctor_name = row[1].title()
-        time_slots = [convert_to_am_pm(t.replace(".", ":")) if "." in str(t) else convert_to_am_pm(t) for t in row[2][:5]]  # Limit to 5 slots
+    for doctor_name, slots in sorted(rows.items()):
+        doctor_name = doctor_name.title()
+        time_slots = [convert_to_am_pm(t) for t in slots[:5]]  # Limit to 5 slots
         output += f"Dr. {doctor_name}: {', '.join(time_slots)}\n"
 
     return output
 
 
 # -----------------------------------------
-# 4. SET APPOINTMENT
+# 4. CHECK AVAILABILITY OVER A DATE RANGE
+# -----------------------------------------
+@tool
+def check_availability_range(
+    start_date: str,  # "DD-MM-YYYY"
+    end_date: str,  # "DD-MM-YYYY", inclusive
+    doctor_name: str = None,  # Optional: a specific doctor
+    specialization: str = None,  # Optional: every doctor of a specialization
+    time_from: str = None,  # Optional: "HH:MM" (24-hour), earliest start time
+    time_to: str = None  # Optional: "HH:MM" (24-hour), slots must start before this
+):
+    """
+    Check availability over several days in one call (e.g. "anything next week?",
+    "any mornings between the 5th and the 9th?"). Give either doctor_name or specialization.
+    start_date/end_date: "DD-MM-YYYY", time_from/time_to: "HH:MM" (24-hour).
+    Returns a per-day summary: number of free slots and the first few times per doctor.
+    """
+    from datetime import datetime
+
+    if not doctor_name and not specialization:
+        return "Please specify either doctor_name or specialization to check availability."
+    try:
+        start = datetime.strptime(start_date, "%d-%m-%Y")
+        end = datetime.strptime(end_date, "%d-%m-%Y")
+        for t in (time_from, time_to):
+            if t:
+                datetime.strptime(t, "%H:%M")
+    except ValueError:
+        return "Invalid format. Dates must be DD-MM-YYYY and times HH:MM (24-hour)."
+    if end < start:
+        return "end_date must not be before start_date."
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        return f"Please ask for at most {MAX_RANGE_DAYS} days at a time."
+
+    days = get_schedule_store().available_in_range(
+        start_date, end_date,
+        doctor_name=doctor_name.lower() if doctor_name else None,
+        specialization=specialization.lower() if specialization else None,
+        time_from=time_from, time_to=time_to,
+    )
+    if not days:
+        return f"No availability between {start_date} and {end_date}."
+
+    output = f"Availability from {start_date} to {end_date}\n"
+    for day, doctors in days.items():
+        summary = []
+        for doctor, times in sorted(doctors.items()):
+            shown = ", ".join(convert_to_am_pm(t) for t in times[:3])
+            more = f" (+{len(times) - 3} more)" if len(times) > 3 else ""
+            summary.append(f"Dr. {doctor.title()}: {shown}{more}")
+        output += f"{day}: {' | '.join(summary)}\n"
+    return output
+
+
+# -----------------------------------------
+# 5. SET APPOINTMENT
 # -----------------------------------------
 @tool
 def set_appointment(
     date: str,      # "DD-MM-YYYY HH:MM"
     id_number: str, # patient ID
-    doctor_name: Literal[
-        'kevin anderson','robert martinez','susan davis','daniel miller',
-        'sarah wilson','michael green','lisa brown','jane smith',
-        'emily johnson','john doe'
-    ]
+    doctor_name: str
 ):
     """
     Set an appointment for a specific datetime.
     date must be "DD-MM-YYYY HH:MM"
     """
 
-    df = pd.read_csv("data/doctor_availability.csv")
-
     from datetime import datetime
-    def convert_datetime_format(dt_str):
-        dt = datetime.strptime(dt_str, "%d-%m-%Y %H:%M")
-        # Return both formats to match what's in CSV
-        return dt.strftime("%d-%m-%Y %H:%M"), dt.strftime("%d-%m-%Y %H.%M")
+    formatted = datetime.strptime(date, "%d-%m-%Y %H:%M").strftime("%d-%m-%Y %H:%M")
 
-    formatted_colon, formatted_dot = convert_datetime_format(date)
+    if not get_schedule_store().book(formatted, doctor_name.lower(), id_number):
+        return "No available appointments for that time."
 
-    # Check availability using both formats (CSV might have either)
-    case = df[
-        ((df['date_slot'] == formatted_colon) | (df['date_slot'] == formatted_dot))
-        & (df['doctor_name'] == doctor_name.lower())
-        & (df['is_available'] == True)
-    ]
+    return "Appointment successfully booked."
 
-    if len(case) == 0:
-        return "No available appointments for that time."
 
-    # Update using the actual format found in CSV
-    actual_slot = case['date_slot'].iloc[0]  # Get the actual format from CSV
-    
-    df.loc[
-        (df['date_slot'] == actual_slot)
-        & (df['doctor_name'] == doctor_name.lower()),
-        ['is_available', 'patient_to_attend']
-    ] = [False, id_number]
+# -----------------------------------------
+# 6. LIST MY APPOINTMENTS
+# -----------------------------------------
+@tool
+def list_my_appointments(id_number: str):
+    """
+    List all of the patient's booked appointments (date, time and doctor), earliest first;
+    past dates are included.
+    Use it when the patient wants to cancel or reschedule without giving the exact date and time.
+    """
+    appointments = get_schedule_store().appointments(id_number)
+    if not appointments:
+        return "You have no appointments."
 
-    df.to_csv("data/doctor_availability.csv", index=False)
-    return "Appointment successfully booked."
+    lines = [f"{slot} with Dr. {doctor.title()}" for slot, doctor in appointments]
+    return f"You have {len(lines)} appointment(s):\n" + "\n".join(lines)
+
+
+def _resolve_appointment(id_number, doctor_name: str, date: str = None):
+    """The slot to act on: `date` if given, else the patient's only appointment with the doctor."""
+    if date:
+        return date
+    slots = [slot for slot, doctor in get_schedule_store().appointments(id_number) if doctor == doctor_name]
+    return slots[0] if len(slots) == 1 else None
 
 
 # -----------------------------------------
-# 5. CANCEL APPOINTMENT
+# 7. CANCEL APPOINTMENT
 # -----------------------------------------
 @tool
 def cancel_appointment(
-    date: str,      # "DD-MM-YYYY HH:MM"
     id_number: str,
-    doctor_name: Literal[
-        'kevin anderson','robert martinez','susan davis','daniel miller',
-        'sarah wilson','michael green','lisa brown','jane smith',
-        'emily johnson','john doe'
-    ]
+    doctor_name: str,
+    date: str = None  # "DD-MM-YYYY HH:MM"; optional if the patient has one appointment with the doctor
 ):
     """
     Cancel an existing appointment.
+    date may be left out when the patient has exactly one appointment with the doctor.
     """
 
-    df = pd.read_csv("data/doctor_availability.csv")
+    doctor_name = doctor_name.lower()
+    date = _resolve_appointment(id_number, doctor_name, date)
+    if date is None:
+        return "Please tell me which appointment to cancel (see list_my_appointments)."
 
-    case = df[
-        (df['date_slot'] == date)
-        & (df['patient_to_attend'] == id_number)
-        & (df['doctor_name'] == doctor_name)
-    ]
-
-    if len(case) == 0:
+    if not get_schedule_store().cancel(date, doctor_name, id_number):
         return "You do not have any appointment with these details."
 
-    df.loc[
-        (df['date_slot'] == date)
-        & (df['patient_to_attend'] == id_number)
-        & (df['doctor_name'] == doctor_name),
-        ['is_available', 'patient_to_attend']
-    ] = [True, None]
-
-    df.to_csv("data/doctor_availability.csv", index=False)
     return "Appointment successfully cancelled."
 
 
 # -----------------------------------------
-# 6. RESCHEDULE APPOINTMENT
+# 8. RESCHEDULE APPOINTMENT
 # -----------------------------------------
 @tool
 def reschedule_appointment(
-    old_date: str,      # "DD-MM-YYYY HH:MM"
     new_date: str,      # "DD-MM-YYYY HH:MM"
     id_number: str,
-    doctor_name: Literal[
-        'kevin anderson','robert martinez','susan davis','daniel miller',
-        'sarah wilson','michael green','lisa brown','jane smith',
-        'emily johnson','john doe'
-    ]
+    doctor_name: str,
+    old_date: str = None  # "DD-MM-YYYY HH:MM"; optional if the patient has one appointment with the doctor
 ):
     """
     Reschedule appointment from old_date to new_date.
+    old_date may be left out when the patient has exactly one appointment with the doctor.
     """
 
-    df = pd.read_csv("data/doctor_availability.csv")
-
-    available = df[
-        (df['date_slot'] == new_date)
-        & (df['is_available'] == True)
-        & (df['doctor_name'] == doctor_name)
-    ]
-
-    if len(available) == 0:
-        return "Desired new date has no available slots."
-
-    cancel_appointment.invoke({"date": old_date, "id_number": id_number, "doctor_name": doctor_name})
-    set_appointment.invoke({"date": new_date, "id_number": id_number, "doctor_name": doctor_name})
-
-    return "Appointment successfully rescheduled."
+    doctor_name = doctor_name.lower()
+    old_date = _resolve_appointment(id_number, doctor_name, old_date)
+    if old_date is None:
+        return "Please tell me which appointment to move (see list_my_appointments)."
+
+    # one atomic move in the store: the old slot is only released if the new one is taken
+    result = get_schedule_store().reschedule(old_date, new_date, doctor_name, id_number)
+    return {
+        RescheduleResult.RESCHEDULED: "Appointment successfully rescheduled.",
+        RescheduleResult.NOT_BOOKED: "You do not have any appointment with these details.",
+        RescheduleResult.UNKNOWN_SLOT: "The doctor has no slot at the new date and time.",
+        RescheduleResult.SLOT_TAKEN: "Desired new date has no available slots. Your current appointment is unchanged.",
+        RescheduleResult.SAME_SLOT: "That is already the time of your appointment.",
+    }[result]
@@ -0,0 +1,157 @@
+import re
+from typing import NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from pydantic import ValidationError
+
+from data_models.models import PendingAppointment
+from utils.intent import find_dates, find_times
+from utils.router import asks_for_confirmation
+
+
+DEFAULT_KEEP_TURNS = 4
+COMPLETED_MARKERS = (
+    "SUCCESSFULLY BOOKED", "SUCCESSFULLY CANCELLED", "SUCCESSFULLY RESCHEDULED", "YOUR APPOINTMENT IS BOOKED",
+)
+# first match wins: "reschedule my booking" is a reschedule
+ACTION_WORDS = (
+    ("cancel", {"cancel"}),
+    ("reschedule", {"reschedule", "move", "change"}),
+    ("book", {"book", "appointment", "schedule", "reserve"}),
+)
+
+
+class ConversationFacts(NamedTuple):
+    """What an older part of the conversation established (last mention wins)."""
+    doctor: Optional[str]
+    specialization: Optional[str]
+    date: Optional[str]
+    time: Optional[str]
+    pending_offer: Optional[str]  # last assistant question awaiting a yes/no
+    completed: list  # assistant confirmations of finished bookings/cancellations
+
+
+def dedupe_replies(messages: list) -> list:
+    """Drop assistant messages that repeat the previous assistant message verbatim."""
+    result = []
+    last_ai = None
+    for msg in messages:
+        if isinstance(msg, AIMessage):
+            content = msg.content.strip()
+            if content == last_ai:
+                continue
+            last_ai = content
+        result.append(msg)
+    return result
+
+
+def mentions(text: str, doctors: dict) -> dict:
+    """{"doctor" | "specialization" | "date" | "time": set of values} named in text."""
+    text = text.lower()
+    return {
+        "doctor": {name for name in doctors if name in text},
+        "specialization": {
+            spec for spec in set(doctors.values())
+            if spec in text or spec.replace("_", " ") in text
+        },
+        "date": find_dates(text),
+        "time": find_times(text),
+    }
+
+
+def extract_facts(messages: list, doctors: dict) -> ConversationFacts:
+    facts = dict.fromkeys(("doctor", "specialization", "date", "time"))
+    pending_offer = None
+    completed = []
+    for msg in messages:
+        if not isinstance(msg, (HumanMessage, AIMessage)):
+            continue
+        for field, values in mentions(msg.content, doctors).items():
+            if len(values) == 1:
+                facts[field] = next(iter(values))
+        if isinstance(msg, AIMessage):
+            pending_offer = msg.content if asks_for_confirmation(msg.content) else None
+            if any(marker in msg.content.upper() for marker in COMPLETED_MARKERS):
+                completed.append(msg.content)
+        else:
+            # the user has answered (or moved on from) whatever was offered
+            pending_offer = None
+    return ConversationFacts(**facts, pending_offer=pending_offer, completed=completed)
+
+
+def update_frame(frame: PendingAppointment, messages: list, doctors: dict) -> PendingAppointment:
+    """
+    Fold the messages after frame.seen into the pending-appointment frame.
+    User messages set the action and whatever they name unambiguously.
+    An assistant offer ("... at 8 AM on 07-08-2024. Should I book it?")
+    defines what a "yes" would book: single mentions are taken, fields it
+    names several options for are cleared. A completed booking or
+    cancellation starts a fresh frame.
+    """
+    values = frame.model_dump()
+    for msg in messages[frame.seen:]:
+        if not isinstance(msg, (HumanMessage, AIMessage)):
+            continue
+        if isinstance(msg, AIMessage):
+            if any(marker in msg.content.upper() for marker in COMPLETED_MARKERS):
+                values = PendingAppointment().model_dump()
+                continue
+            if not asks_for_confirmation(msg.content):
+                continue
+            values["action"] = values["action"] or "book"
+        else:
+            words = set(re.findall(r"[a-z]+", msg.content.lower()))
+            action = next((a for a, keywords in ACTION_WORDS if words & keywords), None)
+            values["action"] = action or values["action"]
+
+        changes = {}
+        for field, found in mentions(msg.content, doctors).items():
+            if len(found) == 1:
+                changes[field] = next(iter(found))
+            elif len(found) > 1 and isinstance(msg, AIMessage):
+                changes[field] = None
+        if changes.get("doctor"):
+            changes["specialization"] = doctors[changes["doctor"]]
+        try:
+            values = PendingAppointment(**{**values, **changes}).model_dump()
+        except ValidationError:
+            continue
+    values["seen"] = len(messages)
+    return PendingAppointment(**values)
+
+
+def render_summary(facts: ConversationFacts, dropped_turns: int) -> str:
+    lines = [f"Summary of the {dropped_turns} earlier turn(s) of this conversation:"]
+    for label, value in (
+        ("doctor", facts.doctor),
+        ("specialization", facts.specialization),
+        ("date", facts.date),
+        ("time", facts.time),
+    ):
+        if value:
+            lines.append(f"- {label}: {value}")
+    if facts.pending_offer:
+        lines.append(f"- assistant was waiting for confirmation of: {facts.pending_offer}")
+    for done in facts.completed[-3:]:
+        lines.append(f"- completed: {done}")
+    return "\n".join(lines)
+
+
+def window_messages(messages: list, doctors: dict, keep_turns: int = DEFAULT_KEEP_TURNS) -> list:
+    """
+    Messages to send to an LLM: duplicate assistant replies removed, the last
+    `keep_turns` user turns verbatim, and everything before them replaced by
+    one SystemMessage summarising the facts it established.
+    keep_turns <= 0 returns the messages unchanged.
+    """
+    if keep_turns <= 0:
+        return messages
+    messages = dedupe_replies(messages)
+    human_positions = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if len(human_positions) <= keep_turns:
+        return messages
+    cut = human_positions[-keep_turns]
+    older, recent = messages[:cut], messages[cut:]
+    summary = render_summary(extract_facts(older, doctors), len(human_positions) - keep_turns)
+    return [SystemMessage(content=summary)] + recent
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, Field, PrivateAttr
+
+from utils.context import ACTION_WORDS
+from utils.intent import find_dates, find_times
+
+# patient ID as the worker prompts / supervisor messages state it
+_PATIENT_ID = re.compile(r"(?:id number is:?|identification number is)\s*(\d+)", re.IGNORECASE)
+_DR_NAME = re.compile(r"\bdr\.?\s+([a-z]+ [a-z]+)")
+ASK_FOR_DETAILS = "Which doctor or specialization, and which date and time?"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for ChatGroq used by load tests,
+    benchmarks and LLM_PROVIDER=fake (see utils/llms.py). Every call waits
+    `latency` seconds, give or take `jitter` of it from a seeded generator
+    (asyncio.sleep on the async path, so it behaves like a network round-trip).
+
+    What it answers, first match wins:
+    - `script`: one entry per call, in order. A string is a text reply (the
+      `next` worker for structured output), a dict an AIMessage's content /
+      tool_calls (the parsed object for structured output).
+    - structured output follows the supervisor's Router contract: route a
+      fresh user message to information_node (booking_node for book / cancel /
+      reschedule requests when `use_tools` is on), anything else to FINISH.
+    - with `use_tools` and tools bound, it acts like a tool-using model: the
+      first call of a turn calls the bound tool that fits the conversation
+      (arguments read from it), the next one answers with the tool's result.
+    - otherwise `reply`, word by word when streamed.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0  # +- fraction of latency
+    seed: int = 0
+    reply: str = "Dr. John Doe is available at 8 AM on 07-08-2024. Should I book it?"
+    use_tools: bool = False
+    script: List[Any] = Field(default_factory=list)
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _rng: random.Random = PrivateAttr(default=None)
+    _cursor: int = PrivateAttr(default=0)
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    # -----------------------------------------
+    # TIMING
+    # -----------------------------------------
+    def _delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            if self._rng is None:
+                self._rng = random.Random(self.seed)
+            return max(0.0, self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+    # -----------------------------------------
+    # RESPONSES
+    # -----------------------------------------
+    def _next_scripted(self):
+        with self._lock:
+            self._calls += 1
+            if self._cursor >= len(self.script):
+                return None
+            self._cursor += 1
+            return self.script[self._cursor - 1]
+
+    def _call_id(self) -> str:
+        return f"call_fake_{self._calls}"
+
+    def _respond(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        message = self._message(messages, **kwargs)
+        # approximate token counts, like a provider's usage report
+        tokens_in, tokens_out = count_tokens_approximately(messages), count_tokens_approximately([message])
+        message.usage_metadata = {"input_tokens": tokens_in, "output_tokens": tokens_out, "total_tokens": tokens_in + tokens_out}
+        return message
+
+    def _message(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        structured = kwargs.get("structured_output")
+        entry = self._next_scripted()
+        if entry is not None:
+            if structured:
+                args = {"next": entry, "reasoning": "fake: scripted"} if isinstance(entry, str) else entry
+                return self._tool_call_message(structured, args)
+            if isinstance(entry, str):
+                return AIMessage(content=entry)
+            calls = [{"name": c["name"], "args": c.get("args", {}), "id": self._call_id()} for c in entry.get("tool_calls", [])]
+            return AIMessage(content=entry.get("content", ""), tool_calls=calls)
+        if structured:
+            return self._tool_call_message(structured, self._route_decision(messages))
+        if self.use_tools and kwargs.get("tools"):
+            return self._tool_step(messages, kwargs["tools"])
+        return AIMessage(content=self.reply)
+
+    def _tool_call_message(self, name: str, args: dict) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": self._call_id()}])
+
+    def _route_decision(self, messages) -> dict:
+        last = messages[-1] if messages else {}
+        role = last.get("role") if isinstance(last, dict) else getattr(last, "type", "")
+        if role in ("user", "human"):
+            content = last.get("content", "") if isinstance(last, dict) else last.content
+            if self.use_tools and _action(content):
+                return {"next": "booking_node", "reasoning": "fake: booking request"}
+            return {"next": "information_node", "reasoning": "fake: new user message"}
+        return {"next": "FINISH", "reasoning": "fake: worker already replied"}
+
+    def _tool_step(self, messages: List[BaseMessage], tools: list) -> AIMessage:
+        turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        results = [m for m in messages[turn_start + 1:] if isinstance(m, ToolMessage)]
+        if results:
+            return AIMessage(content=str(results[-1].content))
+        call = plan_tool_call(messages, {t["function"]["name"]: t["function"] for t in tools})
+        if call is None:
+            return AIMessage(content=ASK_FOR_DETAILS)
+        return self._tool_call_message(*call)
+
+    # -----------------------------------------
+    # BaseChatModel
+    # -----------------------------------------
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, **kwargs))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, **kwargs))])
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=message.content, tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]))
+            return
+        for token in re.findall(r"\S+\s*", message.content):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._delay())
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._delay())
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs: Any):
+        # same shape as ChatGroq: OpenAI-format schemas passed to every call
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        # like function-calling structured output: the model "calls" the schema
+        name = schema.__name__ if isinstance(schema, type) else schema.get("title", "output")
+
+        def parse(message: AIMessage):
+            args = message.tool_calls[0]["args"]
+            if isinstance(schema, type) and issubclass(schema, BaseModel):
+                return schema(**args)
+            return args
+
+        return self.bind(structured_output=name) | RunnableLambda(parse)
+
+
+# -----------------------------------------
+# TOOL PLANNING (use_tools)
+# -----------------------------------------
+def _action(text: str) -> Optional[str]:
+    words = set(re.findall(r"[a-z]+", text.lower()))
+    if "my" in words and words & {"appointments", "bookings"}:
+        return "list"
+    return next((action for action, keys in ACTION_WORDS if words & keys), None)
+
+
+def _choices(tools: dict, field: str) -> list:
+    """Values the bound schemas allow for field (the registry's roster Literals)."""
+    for function in tools.values():
+        prop = function.get("parameters", {}).get("properties", {}).get(field, {})
+        for option in [prop] + prop.get("anyOf", []):
+            if option.get("enum"):
+                return option["enum"]
+    return []
+
+
+def _facts(messages: List[BaseMessage], tools: dict) -> dict:
+    """Most recent doctor / specialization, date, time and patient ID in the conversation."""
+    doctors, specializations = _choices(tools, "doctor_name"), _choices(tools, "specialization")
+    facts = {}
+    for message in reversed(messages):
+        text = str(message.content).lower()
+        if isinstance(message, SystemMessage):
+            match = _PATIENT_ID.search(text)
+            if match:
+                facts.setdefault("id_number", match.group(1))
+            continue
+        if not isinstance(message, (HumanMessage, AIMessage)):
+            continue
+        if "doctor" not in facts and "specialization" not in facts:
+            doctor = next((d for d in doctors if d in text), None) if doctors else next(iter(_DR_NAME.findall(text)), None)
+            specialization = next((s for s in specializations if s in text or s.replace("_", " ") in text), None)
+            if doctor:
+                facts["doctor"] = doctor
+            elif specialization:
+                facts["specialization"] = specialization
+        dates, times = find_dates(text), find_times(text)
+        if dates and "date" not in facts:
+            facts["date"] = sorted(dates, key=lambda d: d[6:] + d[3:5] + d[:2])[-1]
+        if times and "time" not in facts:
+            facts["time"] = sorted(times)[-1]
+    return facts
+
+
+def plan_tool_call(messages: List[BaseMessage], tools: dict) -> Optional[tuple]:
+    """(tool name, args) that answers the latest user message, or None if details are missing."""
+    question = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    facts = _facts(messages, tools)
+    who = {"doctor_name": facts["doctor"]} if "doctor" in facts else {}
+    if not who and "specialization" in facts:
+        who = {"specialization": facts["specialization"]}
+    patient = facts.get("id_number", "")
+
+    if "set_appointment" in tools:
+        action = _action(question) or "book"
+        if action == "list":
+            return "list_my_appointments", {"id_number": patient}
+        if "doctor_name" not in who:
+            return None
+        if action == "cancel":
+            return "cancel_appointment", {"id_number": patient, **who}
+        if "date" not in facts or "time" not in facts:
+            return None
+        slot = f"{facts['date']} {facts['time']}"
+        if action == "reschedule":
+            # the new slot is the one after "to"
+            target = question.lower().rsplit(" to ", 1)[-1]
+            new_dates, new_times = find_dates(target), find_times(target)
+            new_slot = f"{next(iter(new_dates), facts['date'])} {next(iter(new_times), facts['time'])}"
+            return "reschedule_appointment", {"new_date": new_slot, "id_number": patient, **who}
+        return "set_appointment", {"date": slot, "id_number": patient, **who}
+
+    if not _facts([HumanMessage(content=question)], tools):
+        return None  # nothing to look up ("hello")
+    dates = sorted(find_dates(question.lower()), key=lambda d: d[6:] + d[3:5] + d[:2])
+    if len(dates) >= 2 and who and "check_availability_range" in tools:
+        return "check_availability_range", {"start_date": dates[0], "end_date": dates[-1], **who}
+    if not who or "date" not in facts:
+        return None
+    if "time" in facts and "check_specific_slot" in tools and find_times(question):
+        return "check_specific_slot", {"date": facts["date"], "time": facts["time"], **who}
+    if "doctor_name" in who and "check_availability_by_doctor" in tools:
+        return "check_availability_by_doctor", {"date": facts["date"], **who}
+    if "check_availability_by_specialization" in tools:
+        return "check_availability_by_specialization", {"date": facts["date"], **who}
+    return None
@@ -0,0 +1,82 @@
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+_DATE = re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})\b")
+# "8 am", "8:30pm", "14:00"
+_TIME = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b", re.IGNORECASE)
+# ranges, alternatives and parts of the day: the question is about more (or less) than its one date and time
+RANGE_WORDS = {
+    "week", "weeks", "weekend", "month", "days", "after", "before", "until", "till", "from", "by", "or",
+    "between", "through", "around", "next", "following", "earliest", "latest", "soonest",
+    "morning", "afternoon", "evening", "noon", "night",
+}
+
+
+class Intent(NamedTuple):
+    """Normalised availability question: exactly one of doctor / specialization is set."""
+    date: str  # "DD-MM-YYYY"
+    doctor: Optional[str]
+    specialization: Optional[str]
+    time: Optional[str]  # "HH:MM" or None for the whole day
+
+
+def _one(matches: set):
+    return next(iter(matches)) if len(matches) == 1 else None
+
+
+def find_dates(text: str) -> set:
+    dates = set()
+    for day, month, year in _DATE.findall(text):
+        try:
+            dates.add(datetime(int(year), int(month), int(day)).strftime("%d-%m-%Y"))
+        except ValueError:
+            pass
+    return dates
+
+
+def find_times(text: str) -> set:
+    # dates would otherwise read as times ("07-08" is not "07:08", but be safe)
+    text = _DATE.sub(" ", text)
+    times = set()
+    for hour, minute, period, hour24, minute24 in _TIME.findall(text):
+        if period:
+            h = int(hour) % 12 + (12 if period.lower() == "pm" else 0)
+            m = int(minute or 0)
+        else:
+            h, m = int(hour24), int(minute24)
+        if h < 24 and m < 60:
+            times.add(f"{h:02d}:{m:02d}")
+    return times
+
+
+def extract_intent(text: str, doctors: dict) -> Optional[Intent]:
+    """
+    Pull (date, doctor or specialization, time) out of a patient's question.
+    doctors is {doctor_name: specialization} (see BaseScheduleStore.doctors()).
+    Returns None unless the question names exactly one date, one doctor or
+    one specialization (not both), and at most one time, and has no range or
+    relative-time words ("the week after 05-08-2024", "after 2 pm").
+    """
+    lowered = " ".join(re.findall(r"[a-z0-9:\-/.]+", text.lower()))
+    if RANGE_WORDS & set(re.findall(r"[a-z]+", lowered)):
+        return None
+    date = _one(find_dates(lowered))
+    if date is None:
+        return None
+
+    named_doctors = {d for d in doctors if d in lowered}
+    named_specs = {
+        s for s in set(doctors.values())
+        if s in lowered or s.replace("_", " ") in lowered
+    }
+    doctor = _one(named_doctors)
+    specialization = _one(named_specs)
+    if len(named_doctors) > 1 or len(named_specs) > 1 or (doctor and specialization) or not (doctor or specialization):
+        return None
+
+    times = find_times(lowered)
+    if len(times) > 1:
+        return None
+    return Intent(date, doctor, specialization, _one(times))
@@ -1,26 +1,61 @@
 import os
-from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_MODEL = "openai/gpt-oss-120b"
+
+
+def _groq(model_name: str):
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model=model_name,
+        groq_api_key=os.getenv("GROQ_API_KEY")
+    )
+
+
+def _fake(model_name: str):
+    # offline and deterministic: load tests, benchmarks, demos without a key
+    from utils.fake_llm import FakeChatModel
+
+    return FakeChatModel(
+        latency=float(os.getenv("FAKE_LLM_LATENCY", 0)),
+        jitter=float(os.getenv("FAKE_LLM_JITTER", 0)),
+        seed=int(os.getenv("FAKE_LLM_SEED", 0)),
+        use_tools=os.getenv("FAKE_LLM_TOOLS", "1") == "1",
+    )
+
+
+# LLM_PROVIDER name -> factory(model_name) returning a LangChain chat model
+PROVIDERS = {
+    "groq": _groq,
+    "fake": _fake,
+}
+
+
+def register_provider(name: str, factory):
+    """Make factory(model_name) available as LLM_PROVIDER=name."""
+    PROVIDERS[name.lower()] = factory
+
+
 class LLMModel:
-    def __init__(self, model_name="openai/gpt-oss-120b"):
-        if not model_name:
+    def __init__(self, model_name=None, provider=None):
+        self.model_name = model_name or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        if not self.model_name:
             raise ValueError("Model is not defined.")
 
-        self.model_name = model_name
-        self.client = ChatGroq(
-            model=self.model_name,
-            groq_api_key=os.getenv("GROQ_API_KEY")
-        )
-        
+        self.provider = (provider or os.getenv("LLM_PROVIDER", "groq")).lower()
+        if self.provider not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider {self.provider!r}; expected one of {sorted(PROVIDERS)}.")
+        self.client = PROVIDERS[self.provider](self.model_name)
+
     def get_model(self):
         return self.client
 
 if __name__ == "__main__":
-    llm_instance = LLMModel()  
+    llm_instance = LLMModel()
     llm_model = llm_instance.get_model()
-    
+
     response = llm_model.invoke("hi")
     print(response)
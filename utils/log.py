@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# correlation ID of the request being handled ("-" outside requests)
+request_id_var = ContextVar("request_id", default="-")
+# whether this request's verbose state dumps are logged; None outside requests (decided per dump)
+_dump_sampled = ContextVar("dump_sampled", default=None)
+
+# attributes every LogRecord has; anything else came in through extra= and is a structured field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def state_dump_rate() -> float:
+    """Share of requests whose state dumps are logged at DEBUG (LOG_STATE_SAMPLE_RATE, default 1)."""
+    return float(os.getenv("LOG_STATE_SAMPLE_RATE", 1))
+
+
+@contextmanager
+def request_context(request_id: str = None):
+    """
+    Tag every log record of the with-block (and the tasks it starts) with
+    request_id, a fresh one if not given, and decide once whether its state
+    dumps are sampled. Yields the ID.
+    """
+    request_id = request_id or new_request_id()
+    id_token = request_id_var.set(request_id)
+    sample_token = _dump_sampled.set(random.random() < state_dump_rate())
+    try:
+        yield request_id
+    finally:
+        _dump_sampled.reset(sample_token)
+        request_id_var.reset(id_token)
+
+
+def dump_state(logger: logging.Logger, label: str, value):
+    """
+    Log a verbose dump (graph state, prompt messages) at DEBUG, for sampled
+    requests only. Nothing is formatted unless it is written.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    sampled = _dump_sampled.get()
+    if sampled is None:
+        sampled = random.random() < state_dump_rate()
+    if sampled:
+        logger.debug("%s: %r", label, value, extra={"dump": label})
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, request_id, message and any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """
+    Send log records to stderr, once per process. LOG_LEVEL (default INFO)
+    sets the level and LOG_FORMAT picks "text" (default) or "json". Either
+    way each record carries the request's correlation ID.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        handler = logging.StreamHandler()
+        handler.addFilter(_RequestIdFilter())
+        if (fmt or os.getenv("LOG_FORMAT", "text")).lower() == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        _configured = True
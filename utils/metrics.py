@@ -0,0 +1,296 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# seconds; node and LLM timings reach tens of seconds, store reads tens of microseconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> value
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += [line for key, value in items for line in self._samples(zip(self.labelnames, key), value)]
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, pairs, value):
+        yield f"{self.name}{_labels(list(pairs))} {_number(value)}"
+
+
+class Histogram(_Metric):
+    """Cumulative buckets, sum and count per label set, in Prometheus' layout."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts (last is +Inf), sum]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def _samples(self, pairs, entry):
+        pairs = list(pairs)
+        counts, total = entry
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {cumulative}"
+        yield f"{self.name}_sum{_labels(pairs)} {_number(total)}"
+        yield f"{self.name}_count{_labels(pairs)} {cumulative}"
+
+
+class Registry:
+    """The metrics of this process, rendered in the Prometheus text format (0.0.4)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def reset(self):
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+# -----------------------------------------
+# METRICS
+# -----------------------------------------
+NODE_SECONDS = registry.histogram(
+    "agent_node_duration_seconds",
+    "Time spent in a graph node; ReAct worker nodes as <node>/<inner node>.",
+    ("node",),
+)
+TOOL_SECONDS = registry.histogram(
+    "agent_tool_duration_seconds", "Time spent in a toolkit tool call.", ("tool", "status"),
+)
+LLM_SECONDS = registry.histogram(
+    "agent_llm_duration_seconds", "Time spent in an LLM call, by the graph node that made it.", ("node", "status"),
+)
+LLM_TOKENS = registry.counter(
+    "agent_llm_tokens_total", "LLM tokens, by graph node and direction (input / output).", ("node", "direction"),
+)
+TURN_SECONDS = registry.histogram(
+    "agent_turn_duration_seconds", "End-to-end time of one patient turn, by endpoint mode.", ("mode",),
+)
+LOOP_GUARD_EXITS = registry.counter(
+    "agent_loop_guard_exits_total",
+    "Supervisor exits forced by a loop guard (max_turns, duplicate_response, loop_detected, high_turn_count).",
+    ("reason",),
+)
+STORE_SECONDS = registry.histogram(
+    "schedule_store_operation_seconds", "Time spent in a schedule store operation.", ("backend", "operation", "kind"),
+)
+
+
+def timed_method(histogram: Histogram, method, **labels):
+    """method wrapped so every call is observed in histogram with labels."""
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with histogram.time(**labels):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+# -----------------------------------------
+# LANGCHAIN CALLBACKS
+# -----------------------------------------
+def _node_label(metadata: dict, default: str = "") -> str:
+    """"information_node:<task id>|agent:<task id>" -> "information_node/agent"."""
+    namespace = (metadata or {}).get("langgraph_checkpoint_ns", "")
+    return "/".join(part.split(":")[0] for part in namespace.split("|")) if namespace else default
+
+
+def _token_usage(response) -> tuple:
+    """(input, output) tokens of an LLMResult, from usage_metadata or the provider's token_usage."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+def _callback_handler_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class MetricsCallbackHandler(BaseCallbackHandler):
+        """Feeds node, tool and LLM timings and token counts into the registry."""
+
+        run_inline = True
+
+        def __init__(self):
+            self._started = {}  # run_id -> (histogram, labels, start)
+            self._lock = threading.Lock()
+
+        def _start(self, run_id, histogram, **labels):
+            with self._lock:
+                self._started[run_id] = (histogram, labels, time.perf_counter())
+
+        def _end(self, run_id, status: str = None):
+            with self._lock:
+                started = self._started.pop(run_id, None)
+            if started is None:
+                return None
+            histogram, labels, start = started
+            if status is not None:
+                labels = {**labels, "status": status}
+            histogram.observe(time.perf_counter() - start, **labels)
+            return labels
+
+        # graph nodes: the node's own run carries its name as langgraph_node
+        def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+            name = kwargs.get("name")
+            if name and name != "__start__" and name == (metadata or {}).get("langgraph_node"):
+                self._start(run_id, NODE_SECONDS, node=_node_label(metadata, name))
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            self._end(run_id)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            # a failed or interrupted node is timed too
+            self._end(run_id)
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+            self._start(run_id, TOOL_SECONDS, tool=name)
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self._end(run_id, "ok")
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, "error")
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+            self._start(run_id, LLM_SECONDS, node=_node_label(metadata, "none"))
+
+        def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+            self._start(run_id, LLM_SECONDS, node=_node_label(metadata, "none"))
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            labels = self._end(run_id, "ok")
+            if labels is not None:
+                tokens_in, tokens_out = _token_usage(response)
+                LLM_TOKENS.inc(tokens_in, node=labels["node"], direction="input")
+                LLM_TOKENS.inc(tokens_out, node=labels["node"], direction="output")
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, "error")
+
+    return MetricsCallbackHandler
+
+
+_callbacks = None
+_callbacks_lock = threading.Lock()
+
+
+def instrument_langchain():
+    """
+    Attach the metrics callback handler to every LangChain/LangGraph run in
+    this process (all threads), once. Runs that pass their own callbacks
+    still get it.
+    """
+    global _callbacks
+    with _callbacks_lock:
+        if _callbacks is None:
+            from langchain_core.tracers.context import register_configure_hook
+
+            # a ContextVar default is visible from every thread and task
+            _callbacks = ContextVar("metrics_callback_handler", default=_callback_handler_class()())
+            register_configure_hook(_callbacks, inheritable=True)
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from utils.intent import Intent
+
+
+def _days_apart(a: str, b: str) -> int:
+    """Days between two "DD-MM-YYYY" dates."""
+    return abs((datetime.strptime(a, "%d-%m-%Y") - datetime.strptime(b, "%d-%m-%Y")).days)
+
+
+class CachedResponse(NamedTuple):
+    reply: str
+    tool_results: list  # raw outputs of the availability tools behind the reply
+
+
+class ResponseCache:
+    """
+    Bounded LRU + TTL cache of information_node replies, keyed on the
+    normalised Intent of the question. Entries for a doctor are dropped when
+    the schedule store reports a booking or cancellation within day_window
+    days of their date (see invalidate()): a taken slot's alternatives come
+    from the days either side (SLOT_SEARCH_DAYS). The TTL bounds staleness
+    from writes this process never hears about.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300, day_window: int = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.day_window = day_window
+        self._entries = OrderedDict()  # Intent -> (expires_at, CachedResponse)
+        self._lock = threading.Lock()
+        self.generation = 0  # bumped by every invalidate()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, intent: Intent) -> Optional[CachedResponse]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(intent)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._entries[intent]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(intent)
+            self.hits += 1
+            return item[1]
+
+    def put(self, intent: Intent, reply: str, tool_results: list, generation: Optional[int] = None):
+        """
+        Store a reply. Pass the `generation` read before the tool lookup so a
+        reply computed across a concurrent booking is not cached.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[intent] = (time.monotonic() + self.ttl_seconds, CachedResponse(reply, tool_results))
+            self._entries.move_to_end(intent)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, date: str, doctor: str, specialization: Optional[str] = None):
+        """Drop entries about this doctor, or their specialization, within day_window days of date."""
+        with self._lock:
+            self.generation += 1
+            stale = [
+                intent for intent in self._entries
+                if (
+                    intent.doctor == doctor
+                    or (specialization is not None and intent.specialization == specialization)
+                ) and _days_apart(intent.date, date) <= self.day_window
+            ]
+            for intent in stale:
+                del self._entries[intent]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,131 @@
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+# keyword sets for rule-based intent detection (lower-case, whole words)
+BOOKING_WORDS = {"book", "booking", "appointment", "schedule", "reserve", "cancel", "reschedule", "move", "change"}
+CHANGE_WORDS = {"cancel", "reschedule", "move", "change"}
+AVAILABILITY_WORDS = {"available", "availability", "free", "slot", "slots", "open", "when", "options"}
+CONFIRM_WORDS = {"yes", "yeah", "yep", "yup", "sure", "ok", "okay", "confirm", "perfect", "great"}
+CONFIRM_PHRASES = ("go ahead", "book it")
+# any of these makes a reply not a plain "yes"; "don't", "can't" split into "don"/"can" + "t"
+NEGATION_WORDS = {
+    "no", "not", "nope", "nah", "never", "don", "t", "cancel", "instead", "but", "wait", "hold", "stop",
+    "rather", "other", "another", "different", "else", "elsewhere", "change",
+}
+OFFER_PATTERNS = ("should i book", "shall i book", "book it", "want me to book", "would you like", "go ahead")
+
+ROUTER_CONFIDENCE = 0.8
+
+
+class RouteDecision(NamedTuple):
+    goto: str  # "information_node" | "booking_node" | "FINISH"
+    confidence: float
+    reasoning: str
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z]+", text.lower()))
+
+
+def asks_for_confirmation(ai_text: str) -> bool:
+    text = ai_text.lower()
+    return any(p in text for p in OFFER_PATTERNS) and "?" in text
+
+
+def confirms_offer(messages: list) -> bool:
+    """
+    Whether the last message is a short, unqualified "yes" to a booking the
+    assistant just offered. booking_node books on it without asking the LLM,
+    so anything negated or hedged is not a confirmation.
+    """
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return False
+    previous_ai = next((m for m in reversed(messages[:-1]) if isinstance(m, AIMessage)), None)
+    if previous_ai is None or not asks_for_confirmation(previous_ai.content):
+        return False
+    text = messages[-1].content.lower()
+    words = _words(text)
+    if not words or len(words) > 6 or words & (NEGATION_WORDS | AVAILABILITY_WORDS):
+        return False
+    return bool(words & CONFIRM_WORDS) or any(p in text for p in CONFIRM_PHRASES)
+
+
+def pre_route(messages: list) -> Optional[RouteDecision]:
+    """
+    Cheap, deterministic routing for the supervisor. Returns None when there is
+    nothing to go on; otherwise a decision whose confidence says whether it can
+    be trusted without asking the LLM (see ROUTER_CONFIDENCE).
+    """
+    if not messages:
+        return None
+
+    # a worker has replied and the user hasn't said anything since: the turn is over
+    last = messages[-1]
+    if isinstance(last, AIMessage):
+        return RouteDecision("FINISH", 1.0, "Worker replied; waiting for the user")
+    if not isinstance(last, HumanMessage):
+        return None
+
+    words = _words(last.content)
+
+    # short confirmation of a booking we just offered
+    if confirms_offer(messages):
+        return RouteDecision("booking_node", 0.95, "User confirmed the offered booking")
+
+    wants_change = bool(words & CHANGE_WORDS)
+    wants_booking = bool(words & BOOKING_WORDS)
+    asks_availability = bool(words & AVAILABILITY_WORDS) or last.content.strip().endswith("?")
+
+    if wants_change and words & AVAILABILITY_WORDS:
+        # "can I change doctor, who else is available?" - the booking agent can't look that up
+        return RouteDecision("information_node", 0.5, "Change request mixed with an availability question")
+    if wants_change:
+        return RouteDecision("booking_node", 0.9, "User wants to cancel/reschedule")
+    if asks_availability and not wants_booking:
+        return RouteDecision("information_node", 0.9, "User asking about availability")
+    if wants_booking and not asks_availability:
+        return RouteDecision("booking_node", 0.85, "User wants to book")
+    if wants_booking and asks_availability:
+        # "can I book dr doe tomorrow?" - could be either; let the LLM decide
+        return RouteDecision("information_node", 0.5, "Booking request phrased as a question")
+    return RouteDecision("FINISH", 0.2, "No recognisable intent")
+
+
+class RouterStats:
+    """Counters for how supervisor decisions were made (process-wide)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.fast_path = 0  # decided without the LLM
+            self.llm = 0  # LLM consulted
+            self.by_reason = {}
+
+    def record(self, decision: RouteDecision, used_llm: bool):
+        with self._lock:
+            if used_llm:
+                self.llm += 1
+            else:
+                self.fast_path += 1
+                self.by_reason[decision.reasoning] = self.by_reason.get(decision.reasoning, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.fast_path + self.llm
+            return {
+                "decisions": total,
+                "llm_calls": self.llm,
+                "llm_calls_saved": self.fast_path,
+                "saved_ratio": round(self.fast_path / total, 3) if total else 0.0,
+                "fast_path_by_reason": dict(self.by_reason),
+            }
+
+
+router_stats = RouterStats()
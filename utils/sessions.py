@@ -0,0 +1,118 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class SessionSaver(MemorySaver):
+    """
+    In-memory LangGraph checkpointer for server-side conversations.
+    A session is a LangGraph thread (thread_id == session_id). Sessions are
+    bounded by count (least recently used are evicted first) and by idle
+    time, so memory stays flat no matter how many patients come and go.
+    Each session keeps only its latest checkpoint (see _prune()), so a
+    session grows with its conversation, not with the square of it.
+
+    Sessions live in this process's memory: with several API workers a
+    session is only found by the worker that created it.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 3600):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._last_seen = OrderedDict()  # session_id -> monotonic time of last use
+        self._sessions_lock = threading.Lock()
+
+    # -----------------------------------------
+    # SESSION REGISTRY
+    # -----------------------------------------
+    def create(self) -> str:
+        """Open a new, empty session and return its ID."""
+        session_id = uuid.uuid4().hex
+        self.touch(session_id)
+        return session_id
+
+    def exists(self, session_id: str) -> bool:
+        with self._sessions_lock:
+            self._evict_expired(time.monotonic())
+            return session_id in self._last_seen
+
+    def touch(self, session_id: str):
+        """Mark a session as used now and evict whatever falls out of the bounds."""
+        now = time.monotonic()
+        with self._sessions_lock:
+            self._last_seen[session_id] = now
+            self._last_seen.move_to_end(session_id)
+            self._evict_expired(now)
+            while len(self._last_seen) > self.max_sessions:
+                oldest, _ = self._last_seen.popitem(last=False)
+                self._forget(oldest)
+
+    def close(self, session_id: str) -> bool:
+        with self._sessions_lock:
+            if self._last_seen.pop(session_id, None) is None:
+                return False
+            self._forget(session_id)
+            return True
+
+    def _evict_expired(self, now: float):
+        while self._last_seen:
+            oldest, seen = next(iter(self._last_seen.items()))
+            if now - seen <= self.ttl_seconds:
+                break
+            self._last_seen.popitem(last=False)
+            self._forget(oldest)
+
+    def _forget(self, session_id: str):
+        if hasattr(MemorySaver, "delete_thread"):
+            self.delete_thread(session_id)
+        else:  # older langgraph-checkpoint releases
+            self.storage.pop(session_id, None)
+            for key in [k for k in self.writes if k[0] == session_id]:
+                del self.writes[key]
+
+    # -----------------------------------------
+    # CHECKPOINTER HOOKS (async variants delegate to these)
+    # -----------------------------------------
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        self.touch(thread_id)
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self._prune(thread_id, config["configurable"].get("checkpoint_ns", ""), checkpoint["id"])
+        return next_config
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, latest_id: str):
+        """
+        Drop every checkpoint of the namespace but latest_id, with its pending
+        writes and the channel blobs only it referenced. Each checkpoint holds
+        the full message list, so keeping them all grows a session
+        quadratically. A top-level checkpoint also ends the ReAct workers'
+        subgraph runs of its step, so their namespaces go as well (sessions
+        never resume from an interrupt or an older checkpoint).
+        """
+        namespaces = self.storage.get(thread_id)
+        if not namespaces:
+            return
+        blobs = getattr(self, "blobs", None)  # channel values live in the checkpoint in older releases
+        for ns in list(namespaces):
+            if ns != checkpoint_ns and checkpoint_ns != "":
+                continue
+            checkpoints = namespaces[ns]
+            latest = checkpoints.get(latest_id) if ns == checkpoint_ns else None
+            kept = self._channel_versions(latest) if latest and blobs is not None else {}
+            for checkpoint_id in [c for c in checkpoints if c != latest_id or ns != checkpoint_ns]:
+                saved = checkpoints.pop(checkpoint_id)
+                self.writes.pop((thread_id, ns, checkpoint_id), None)
+                if blobs is not None:
+                    for channel, version in self._channel_versions(saved).items():
+                        if kept.get(channel) != version:
+                            blobs.pop((thread_id, ns, channel, version), None)
+            if not checkpoints:
+                del namespaces[ns]
+
+    def _channel_versions(self, saved: tuple) -> dict:
+        """{channel: version} of a stored (checkpoint, metadata, parent_id) entry."""
+        return self.serde.loads_typed(saved[0]).get("channel_versions", {})